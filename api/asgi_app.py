@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import Dict, List, Tuple
+
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
+
+import model_api
+from data_store import DataStore
+from llm_scheduler import PRIORITY_BACKGROUND, PRIORITY_HEALTH, PRIORITY_INTERACTIVE
+from metrics import LLM_ERRORS, PROMETHEUS_CONTENT_TYPE, REGISTRY, REQUEST_SECONDS, end_trace, stage, start_trace
+from model_api import (
+    CONFIG,
+    apply_health_statuses,
+    build_health_prompt,
+    build_intent_prompt,
+    ci_health_inputs,
+    detect_intent_without_llm,
+    get_cached_health_status,
+    get_raw_health_status,
+    get_session_id,
+    health_cache,
+    health_cache_inputs,
+    health_targets,
+    ingest_metric_samples,
+    llm_scheduler,
+    metric_health,
+    open_incidents_page,
+    parse_intent_response,
+    process_query,
+    remember_llm_intent,
+    sessions
+)
+
+# Async serving mode: run with `hypercorn asgi_app:app --bind 0.0.0.0:5000`.
+# model_api.py remains the Flask entry point.
+app = cors(Quart(__name__))
+
+# Model calls share model_api's scheduler, so the concurrency limit, prompt
+# coalescing and circuit breaker are the same in both serving modes
+async def chat(prompt: str, kind: str, priority: int) -> str:
+    response = await llm_scheduler.chat_async(prompt, kind, priority)
+    return response['message']['content']
+
+async def async_detect_intent(user_query: str) -> Tuple[str, str, str]:
+    with stage("detect_intent"):
+        detected = detect_intent_without_llm(user_query)
+    if detected:
+        return detected
+    try:
+        intent, sub_intent = parse_intent_response(await chat(build_intent_prompt(user_query), "intent", PRIORITY_INTERACTIVE))
+    except Exception as e:
+        intent, sub_intent = "Error", "None"
+    remember_llm_intent(user_query, intent, sub_intent)
+    return intent, sub_intent, "llm"
+
+async def async_get_ci_health_status(ci: str, store: DataStore, priority: int = PRIORITY_HEALTH) -> Dict[str, str]:
+    cached = get_cached_health_status(ci, store)
+    if cached is not None:
+        return cached
+    inputs = ci_health_inputs(ci, store)
+    try:
+        message = (await chat(build_health_prompt(inputs), "health", priority)).strip()
+        health_cache.put(ci, CONFIG["llm_model"], health_cache_inputs(inputs), message)
+    except Exception as e:
+        message = "No additional health details available."
+    return {"status": inputs["status"], "message": message}
+
+async def async_get_ci_health_statuses(cis: List[str], store: DataStore) -> Dict[str, Dict[str, str]]:
+    unique_cis = list({ci.lower(): ci for ci in cis}.values())
+    priority = PRIORITY_HEALTH if len(unique_cis) == 1 else PRIORITY_BACKGROUND
+    semaphore = asyncio.Semaphore(CONFIG["health_concurrency"])
+
+    async def summarise(ci: str) -> Dict[str, str]:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(async_get_ci_health_status(ci, store, priority), CONFIG["health_timeout"])
+            except asyncio.TimeoutError:
+                LLM_ERRORS.inc(kind="health", error="timeout")
+                return get_raw_health_status(ci, store)
+
+    statuses = await asyncio.gather(*(summarise(ci) for ci in unique_cis))
+    return {ci.lower(): status for ci, status in zip(unique_cis, statuses)}
+
+async def async_process_query(user_query: str, context: Dict, store: DataStore) -> Dict:
+    detected = await async_detect_intent(user_query)
+    # Off the event loop: the lookups, graph walks and similarity search are blocking work.
+    # to_thread copies the context, so the request trace still records their stages
+    result = await asyncio.to_thread(process_query, user_query, context, store, summarise=False, detected=detected)
+    targets = health_targets(result)
+    if targets:
+        apply_health_statuses(result, await async_get_ci_health_statuses(targets, store))
+    return result
+
+@app.before_request
+async def begin_trace():
+    start_trace()
+
+@app.after_request
+async def finish_trace(response):
+    trace = end_trace()
+    if trace is not None:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - trace.started,
+            endpoint=request.endpoint or "unknown",
+            status=str(response.status_code)
+        )
+        if CONFIG["debug_timing_header"]:
+            response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+@app.route('/query', methods=['POST'])
+async def handle_query():
+    store = model_api.data_watcher.store
+    if not store.is_complete():
+        return jsonify({"error": "Critical data files are missing or invalid."}), 500
+
+    data = await request.get_json()
+    if not data or "query" not in data:
+        return jsonify({"error": "Missing 'query' in request body"}), 400
+
+    user_query = data["query"]
+    if user_query.lower() == "exit":
+        return jsonify({"message": "Goodbye!"}), 200
+
+    session_id = get_session_id(data, request.headers)
+    context = sessions.load(session_id)
+    result = await async_process_query(user_query, context, store)
+    sessions.save(session_id, context)
+    result["session_id"] = session_id
+    with stage("serialise"):
+        body = jsonify(result)
+    return body, 200
+
+@app.route('/incidents/open', methods=['GET'])
+async def list_open_incidents():
+    body, status = open_incidents_page(model_api.data_watcher.store, request.args)
+    return jsonify(body), status
+
+@app.route('/observability/samples', methods=['POST'])
+async def post_metric_samples():
+    body, status = ingest_metric_samples(await request.get_json(silent=True))
+    return jsonify(body), status
+
+@app.route('/observability/health', methods=['GET'])
+async def get_metric_health():
+    body, status = metric_health(request.args)
+    return jsonify(body), status
+
+@app.route('/metrics', methods=['GET'])
+async def prometheus_metrics():
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5000)
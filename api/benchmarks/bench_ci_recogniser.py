@@ -0,0 +1,99 @@
+"""Recognise CI names in queries against a 100k-CI vocabulary.
+
+The vocabulary is synthetic numbered CIs plus names without digits, the
+fuzzy fallback's largest bucket. Each query kind is timed with
+CIRecogniser.find and with the four regexes extract_ci_name used before,
+and scored on whether the first name returned is the CI the query meant.
+Run from the api directory: python -m benchmarks.bench_ci_recogniser
+"""
+import random
+import re
+import string
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ci_recogniser import CIRecogniser
+from benchmarks.synthetic import ci_name
+
+NUM_CIS = 100_000
+# Names without digits, e.g. "PAYMENT-QXRT-GATEWAY"
+UNNUMBERED = 5_000
+QUERIES = 1_000
+
+PATTERNS = [
+    r"for ([a-zA-Z0-9-_]+)",
+    r"of ([a-zA-Z0-9-_]+)",
+    r"with ([a-zA-Z0-9-_]+)",
+    r"([a-zA-Z0-9-_]+)\s*(health|status|staus|dependencies|upstream|downstream)"
+]
+
+
+def regex_extract(query: str) -> Optional[str]:
+    for pattern in PATTERNS:
+        match = re.search(pattern, query, re.IGNORECASE)
+        if match and match.group(1).lower() not in ["me", "you", "it", "this", "that"]:
+            return match.group(1)
+    return None
+
+
+def vocabulary(rng: random.Random) -> Dict[str, str]:
+    names = [ci_name(index) for index in range(NUM_CIS)]
+    words = ["PAYMENT", "AUTH", "SEARCH", "BILLING", "LEDGER", "CATALOG", "PROFILE", "NOTIFY"]
+    while len(names) < NUM_CIS + UNNUMBERED:
+        middle = "".join(rng.choice(string.ascii_uppercase) for _ in range(4))
+        names.append(f"{rng.choice(words)}-{middle}-{rng.choice(['GATEWAY', 'CLUSTER', 'SERVICE'])}")
+    return {name.lower(): name for name in names}
+
+
+def typo(name: str, rng: random.Random) -> str:
+    # One edit to a letter, never to a digit
+    letters = [index for index, char in enumerate(name) if char.isalpha()]
+    index = rng.choice(letters)
+    if rng.random() < 0.5:
+        return name[:index] + name[index + 1:]
+    return name[:index] + rng.choice(string.ascii_uppercase) + name[index + 1:]
+
+
+def queries(names: List[str], rng: random.Random) -> Dict[str, List[Tuple[str, Optional[str]]]]:
+    """Query kind -> [(query, the CI it means or None)]."""
+    numbered, unnumbered = names[:NUM_CIS], names[NUM_CIS:]
+    pick = lambda: rng.choice(numbered if rng.random() < 0.8 else unnumbered)  # noqa: E731
+    kinds: Dict[str, Callable[[], Tuple[str, Optional[str]]]] = {
+        "exact": lambda: (lambda ci: (f"Check health of {ci}", ci))(pick()),
+        "name first": lambda: (lambda ci: (f"Is {ci} healthy for the release?", ci))(pick()),
+        "two CIs": lambda: (lambda a, b: (f"Show dependencies between {a} and {b}", a))(pick(), pick()),
+        "typo": lambda: (lambda ci: (f"What is upstream of {typo(ci, rng)}?", ci))(pick()),
+        "no CI": lambda: (rng.choice([
+            "Show dependencies for me", "What is the status of the outage?", "List open incidents with health"
+        ]), None)
+    }
+    return {kind: [make() for _ in range(QUERIES)] for kind, make in kinds.items()}
+
+
+def measure(label: str, extract: Callable[[str], Optional[str]], cases: List[Tuple[str, Optional[str]]]) -> None:
+    start = time.perf_counter()
+    results = [extract(query) for query, _ in cases]
+    elapsed = (time.perf_counter() - start) / len(cases)
+    correct = sum((result or "").lower() == (expected or "").lower() for result, (_, expected) in zip(results, cases))
+    print(f"{label:<36} {elapsed * 1e6:>10.1f} us/query {correct / len(cases):>8.1%} correct")
+
+
+def main():
+    rng = random.Random(5)
+    names = vocabulary(rng)
+    start = time.perf_counter()
+    recogniser = CIRecogniser(names)
+    print(f"{'build automaton (' + str(len(recogniser)) + ' names)':<36} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+    def first(query: str) -> Optional[str]:
+        found = recogniser.find(query)
+        return found[0] if found else None
+
+    for kind, cases in queries(list(names.values()), rng).items():
+        print(f"-- {kind}")
+        measure("CIRecogniser.find", first, cases)
+        measure("regex extract_ci_name", regex_extract, cases)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Build and query CMDBGraph over a synthetic 100k-CI CMDB.
+
+Run from the api directory: python -m benchmarks.bench_cmdb_graph
+"""
+import random
+import time
+
+from cmdb_graph import CMDBGraph, DOWNSTREAM, UPSTREAM
+from benchmarks.synthetic import ci_name, generate_cmdb
+
+NUM_CIS = 100_000
+QUERIES = 200
+MAX_DEPTH = 6
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<40} {elapsed * 1000:>10.3f} ms")
+    return result
+
+
+def main():
+    rng = random.Random(3)
+    cmdb_data = timed("generate synthetic CMDB", lambda: generate_cmdb(NUM_CIS))
+    graph = timed("build graph", lambda: CMDBGraph.from_cmdb(cmdb_data))
+    targets = [ci_name(rng.randrange(NUM_CIS)) for _ in range(QUERIES)]
+
+    def closures():
+        for ci in targets:
+            graph.closure(ci, UPSTREAM, MAX_DEPTH)
+            graph.closure(ci, DOWNSTREAM, MAX_DEPTH)
+
+    timed(f"{QUERIES} cold closures (depth {MAX_DEPTH})", closures)
+    timed(f"{QUERIES} cached closures (depth {MAX_DEPTH})", closures)
+    sizes = [len(graph.closure(ci, UPSTREAM, MAX_DEPTH)) for ci in targets]
+    print(f"{'mean upstream blast radius':<40} {sum(sizes) / len(sizes):>10.1f} CIs")
+
+    timed(f"{QUERIES} shortest paths", lambda: [
+        graph.shortest_path(targets[i], targets[-i - 1]) for i in range(QUERIES)
+    ])
+
+    incident_cis = {f"INC{i:07d}": ci_name(rng.randrange(NUM_CIS)) for i in range(500)}
+    groups = timed("shared root causes for 500 incidents", lambda: graph.shared_root_causes(incident_cis, 3))
+    print(f"{'root-cause groups':<40} {len(groups):>10}")
+
+    timed("add edge + invalidate", lambda: graph.add_edge(targets[0], targets[1]), repeat=100)
+    timed("closure after invalidation", lambda: graph.closure(targets[0], DOWNSTREAM, MAX_DEPTH))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Compare linear scans with DataStore index lookups as the dataset grows.
+
+Run from the api directory: python -m benchmarks.bench_data_store
+"""
+import random
+import time
+
+from data_store import DataStore
+from benchmarks.synthetic import ci_name, generate_dataset
+
+SIZES = [1_000, 10_000, 100_000]
+LOOKUPS = 200
+
+
+def linear_lookup(servicenow_data, observability_data, cmdb_data, incident_id, ci):
+    next((i for i in servicenow_data if i["id"].lower() == incident_id.lower()), None)
+    next((e for e in observability_data if e["ci"].lower() == ci.lower()), None)
+    next((e for e in cmdb_data if e["ci"].lower() == ci.lower()), None)
+
+
+def indexed_lookup(store, incident_id, ci):
+    store.get_incident(incident_id)
+    store.get_observability(ci)
+    store.get_cmdb_entry(ci)
+
+
+def main():
+    rng = random.Random(1)
+    print(f"{'incidents':>10} {'build ms':>10} {'linear us/op':>14} {'indexed us/op':>14}")
+    for size in SIZES:
+        servicenow_data, dashboards, observability_data, cmdb_data = generate_dataset(size)
+        num_cis = len(cmdb_data)
+        keys = [(f"inc{rng.randrange(size):07d}", ci_name(rng.randrange(num_cis)).lower()) for _ in range(LOOKUPS)]
+
+        start = time.perf_counter()
+        store = DataStore(servicenow_data, dashboards, observability_data, cmdb_data)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for incident_id, ci in keys:
+            linear_lookup(servicenow_data, observability_data, cmdb_data, incident_id, ci)
+        linear_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+        start = time.perf_counter()
+        for incident_id, ci in keys:
+            indexed_lookup(store, incident_id, ci)
+        indexed_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+        print(f"{size:>10} {build_ms:>10.1f} {linear_us:>14.1f} {indexed_us:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
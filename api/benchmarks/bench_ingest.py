@@ -0,0 +1,70 @@
+"""Peak RSS and load time of json.load versus the streaming compact loader.
+
+Each loader runs in a fresh interpreter so peak RSS is measured in isolation.
+Run from the api directory: python -m benchmarks.bench_ingest [num_incidents ...]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import generate_incidents
+
+LOADERS = {
+    "json.load": "import json; data = json.load(open(PATH))",
+    "streaming dicts": "from ingest import load_records; data = load_records(PATH)",
+    "streaming compact": "from ingest import load_records, IncidentRecord; data = load_records(PATH, IncidentRecord)"
+}
+
+CHILD = """
+import resource, sys, time
+PATH = sys.argv[1]
+start = time.perf_counter()
+{load}
+elapsed = time.perf_counter() - start
+print(len(data), elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def write_dataset(directory: str, num_incidents: int) -> dict:
+    incidents = generate_incidents(num_incidents, max(1, num_incidents // 2))
+    paths = {"array": os.path.join(directory, "incidents.json"), "jsonl": os.path.join(directory, "incidents.jsonl")}
+    with open(paths["array"], 'w') as file:
+        json.dump(incidents, file, indent=2)
+    with open(paths["jsonl"], 'w') as file:
+        for incident in incidents:
+            file.write(json.dumps(incident) + "\n")
+    return paths
+
+
+def run_loader(load: str, path: str) -> tuple:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(load=load), path],
+        check=True, capture_output=True, text=True, cwd=os.getcwd()
+    ).stdout.split()
+    return int(output[0]), float(output[1]), int(output[2]) / 1024
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 500_000]
+    baseline = subprocess.run(
+        [sys.executable, "-c", "import resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"],
+        check=True, capture_output=True, text=True
+    )
+    print(f"interpreter baseline RSS: {int(baseline.stdout) / 1024:.1f} MB")
+    print(f"{'incidents':>10} {'format':>6} {'loader':>18} {'file MB':>8} {'load s':>8} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            paths = write_dataset(directory, size)
+            for file_format, path in paths.items():
+                file_mb = os.path.getsize(path) / 1e6
+                for name, load in LOADERS.items():
+                    if name == "json.load" and file_format == "jsonl":
+                        continue
+                    count, elapsed, peak_mb = run_loader(load, path)
+                    print(f"{count:>10} {file_format:>6} {name:>18} {file_mb:>8.1f} {elapsed:>8.2f} {peak_mb:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
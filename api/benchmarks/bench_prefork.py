@@ -0,0 +1,46 @@
+"""Throughput of prefork.py as the worker count grows.
+
+Runs the load test once per worker count against the same dataset size and
+query mix. Throughput only scales while there are idle cores: the table
+reports os.cpu_count() and efficiency against one worker. Memory is reported
+as PSS, so pages the workers share copy-on-write with the master count once.
+Run from the api directory:
+    python -m benchmarks.bench_prefork [--workers 1 2 4 8] [load_test options]
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+from benchmarks import load_test
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Prefork throughput by worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args, rest = parser.parse_known_args(argv)
+    options = load_test.parse_args(["--server", "prefork", "--concurrency", "32", *rest])
+    return args.workers, options
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    counts, options = parse_args(argv)
+    print(f"{os.cpu_count()} CPU cores; mix={options.mix} incidents={options.incidents} "
+          f"concurrency={options.concurrency} requests={options.requests}")
+    print(f"{'workers':>8} {'rps':>10} {'speed-up':>9} {'efficiency':>11} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'PSS MB':>8} {'errors':>7}")
+    single = None
+    for workers in counts:
+        options.workers = workers
+        result = load_test.run(options)
+        rps = result["throughput_rps"]
+        single = single or rps
+        print(f"{workers:>8} {rps:>10.1f} {rps / single:>8.2f}x {rps / single / workers:>10.0%} "
+              f"{result['latency_ms']['p50']:>9.1f} {result['latency_ms']['p95']:>9.1f} "
+              f"{result['rss_mb']['pss']:>8.1f} {result['errors']:>7}")
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Build and search IncidentSimilarityIndex, up to 1M indexed incidents.
+
+The index is built from synthetic incidents, then padded with random unit
+vectors so search latency can be measured at sizes the generator would take
+minutes to produce. Recall compares the default search with an exact one
+(every partition probed): the share of the exact top 5 matched by results
+scoring at least as high, so ties between identical incidents count as found.
+Run from the api directory:
+python -m benchmarks.bench_similarity [num_rows ...]
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from similarity import IncidentSimilarityIndex
+from benchmarks.synthetic import generate_incidents
+
+NUM_INCIDENTS = 20_000
+QUERIES = 50
+CHUNK = 100_000
+
+
+def pad(index: IncidentSimilarityIndex, rows: int, rng: np.random.Generator) -> None:
+    while index.num_rows < rows:
+        count = min(CHUNK, rows - index.num_rows)
+        vectors = rng.standard_normal((count, index.dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        records = [
+            {"id": f"PAD{index.num_rows + row:07d}", "short_description": "", "affected_ci": None,
+             "status": "Resolved", "resolution_notes": ""}
+            for row in range(count)
+        ]
+        index._append(vectors, records)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    rng = np.random.default_rng(5)
+    incidents = generate_incidents(NUM_INCIDENTS, NUM_INCIDENTS // 4)
+    queries = [incidents[int(i)]["short_description"] for i in rng.integers(0, len(incidents), QUERIES)]
+    with tempfile.TemporaryDirectory() as directory:
+        index = IncidentSimilarityIndex(directory)
+        start = time.perf_counter()
+        index.build(incidents)
+        print(f"build {NUM_INCIDENTS} incidents: {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(f"{'rows':>10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'recall@5':>9}")
+        for size in sizes:
+            pad(index, size, rng)
+            reopened = IncidentSimilarityIndex.open(directory)
+            reopened.search(queries[0])
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                reopened.search(query, k=5)
+                latencies.append((time.perf_counter() - start) * 1000)
+            p50, p95 = np.percentile(latencies, [50, 95])
+            found = [[match["similarity"] for match in reopened.search(query, k=5)] for query in queries]
+            reopened.probes = max(reopened.num_partitions, 1)
+            exact = [[match["similarity"] for match in reopened.search(query, k=5)] for query in queries]
+            hits = sum(sum(score >= best[-1] for score in scores) for scores, best in zip(found, exact) if best)
+            recall = hits / max(1, sum(map(len, exact)))
+            print(f"{reopened.num_rows:>10} {p50:>8.2f} {p95:>8.2f} {max(latencies):>8.2f} {recall:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
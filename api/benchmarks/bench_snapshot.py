@@ -0,0 +1,63 @@
+"""Cold start from the JSON files versus opening a compiled snapshot.
+
+Each start-up runs in a fresh interpreter and reports the time to open the
+store, the first incident lookup, the first dependency closure (which loads
+the CMDB graph) and the process's peak RSS.
+Run from the api directory: python -m benchmarks.bench_snapshot [num_incidents ...]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_dataset
+from snapshot import build_from_files, verify_snapshot
+
+LOADERS = {
+    "json": (
+        "from data_store import DataStore; from data_watcher import load_json_file; "
+        "from ingest import IncidentRecord, ObservabilityRecord, load_records; "
+        "store = DataStore(load_records(P[0], IncidentRecord), load_json_file(P[1]), "
+        "load_records(P[2], ObservabilityRecord), load_json_file(P[3]))"
+    ),
+    "snapshot": "from snapshot import SnapshotStore; store = SnapshotStore(P[4])"
+}
+
+CHILD = """
+import sys, time
+P = sys.argv[1:]
+marks = [time.perf_counter()]
+{load}
+marks.append(time.perf_counter())
+incident = store.get_incident("INC0000001")
+marks.append(time.perf_counter())
+store.graph.closure(incident["affected_ci"], "upstream", 6)
+marks.append(time.perf_counter())
+peak = [line.split()[1] for line in open("/proc/self/status") if line.startswith("VmHWM")][0]
+print(*[(end - start) * 1000 for start, end in zip(marks, marks[1:])], int(peak) / 1024)
+"""
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    print(f"{'incidents':>10} {'loader':>9} {'open ms':>9} {'lookup ms':>10} {'graph ms':>9} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            paths = write_dataset(directory, size) + [os.path.join(directory, "data.snapshot")]
+            start = time.perf_counter()
+            build_from_files(*paths)
+            built = time.perf_counter() - start
+            verify_snapshot(paths[4])
+            print(f"{size:>10} {'build':>9} {built * 1000:>9.1f}  ({os.path.getsize(paths[4]) / 2 ** 20:.1f} MB snapshot)")
+            for name, load in LOADERS.items():
+                output = subprocess.run(
+                    [sys.executable, "-c", CHILD.format(load=load), *paths],
+                    check=True, capture_output=True, text=True, cwd=os.getcwd()
+                ).stdout.split()
+                opened, lookup, graph, peak = map(float, output)
+                print(f"{size:>10} {name:>9} {opened:>9.1f} {lookup:>10.3f} {graph:>9.1f} {peak:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
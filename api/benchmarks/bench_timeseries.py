@@ -0,0 +1,80 @@
+"""Fill MetricStore ring buffers for thousands of CIs and evaluate health.
+
+Compares one vectorised MetricStore.evaluate() over every CI with the same
+rolling statistics computed series by series in Python.
+Run from the api directory: python -m benchmarks.bench_timeseries [num_cis ...]
+"""
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from timeseries import METRICS, MetricStore, Sample
+from benchmarks.synthetic import ci_name
+
+CAPACITY = 120
+INTERVAL = 30.0
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<44} {elapsed * 1000:>10.3f} ms")
+    return result
+
+
+def batches(num_cis: int, rng: np.random.Generator) -> List[List[Sample]]:
+    """One batch per scrape: a sample for every CI and metric, every INTERVAL seconds."""
+    now = time.time()
+    names = [ci_name(i) for i in range(num_cis)]
+    keys = [(name, metric) for name in names for metric in METRICS]
+    baseline = np.repeat(50 + (np.arange(num_cis) % 7) * 6.0, len(METRICS))
+    result = []
+    for step in range(CAPACITY):
+        timestamp = now - (CAPACITY - step) * INTERVAL
+        values = np.clip(rng.normal(baseline, 8), 0, 100).tolist()
+        result.append([(name, metric, value, timestamp) for (name, metric), value in zip(keys, values)])
+    return result
+
+
+def python_loop(store: MetricStore, num_cis: int) -> int:
+    evaluated = 0
+    for row in range(num_cis):
+        for column in range(len(METRICS)):
+            values = store.values[row, column].tolist()
+            times = store.times[row, column].tolist()
+            newest = max(times)
+            window = sorted(v for v, t in zip(values, times) if t >= newest - store.window)
+            p95 = window[max(0, -(-len(window) * 95 // 100) - 1)]
+            mean_t = sum(t for t in times if t >= newest - store.window) / len(window)
+            _ = (window[0], window[-1], sum(window) / len(window), p95, mean_t)
+            evaluated += 1
+    return evaluated
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 50_000]
+    rng = np.random.default_rng(9)
+    for num_cis in sizes:
+        print(f"-- {num_cis} CIs x {len(METRICS)} metrics x {CAPACITY} samples")
+        store = MetricStore(capacity=CAPACITY, min_interval=0.0)
+        scrapes = batches(num_cis, rng)
+        timed(f"ingest {CAPACITY} scrapes", lambda: [store.add(batch) for batch in scrapes])
+        evaluation = timed("vectorised evaluate (all CIs)", lambda: store._evaluate(
+            store.values[:num_cis], store.times[:num_cis], store.names, store.rows
+        ), repeat=3)
+        print(f"{'status counts':<44} {evaluation.counts()}")
+        store.evaluate()
+        timed("memoised evaluate", store.evaluate, repeat=100)
+        timed("per-CI lookup", lambda: evaluation.for_ci(ci_name(num_cis // 2)), repeat=1000)
+        if num_cis <= 10_000:
+            timed("python loop (stats only)", lambda: python_loop(store, num_cis))
+        print(f"{'buffer memory':<44} {(store.values.nbytes + store.times.nbytes) / 2**20:>10.1f} MB")
+
+
+if __name__ == "__main__":
+    np.seterr(all="ignore")
+    main()
@@ -0,0 +1,313 @@
+"""Replay a query mix against /query at fixed concurrency, with a stub LLM.
+
+Writes a synthetic dataset, starts the stub LLM and the app in a child
+process (Flask, the ASGI app under hypercorn, or prefork.py workers), replays
+a seeded query mix and reports latency percentiles, throughput and the server's RSS. Results are
+compared against the stored baseline for the same mix, size and concurrency;
+a regression beyond --tolerance exits with status 1.
+
+Run from the api directory:
+    python -m benchmarks.load_test --incidents 1000 --concurrency 8 --mix default
+    python -m benchmarks.load_test --incidents 1000000 --mix lookup --save-baseline
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.stub_llm import start_stub_llm
+from benchmarks.synthetic import ci_name, write_dataset
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+FLASK_SERVER = """
+import sys
+sys.path.insert(0, {api_dir!r})
+import model_api
+model_api.app.run(host="127.0.0.1", port={port}, threaded=True)
+"""
+
+# Query template -> text, given (rng, num_incidents, num_cis)
+Template = Callable[[random.Random, int, int], str]
+
+TEMPLATES: Dict[str, Template] = {
+    "incident_status": lambda rng, n, c: f"What is the status of INC{rng.randrange(n):07d}?",
+    "ci_health": lambda rng, n, c: f"Check health of {ci_name(rng.randrange(c))}",
+    "dependencies": lambda rng, n, c: f"Show dependencies for {ci_name(rng.randrange(c))}",
+    "upstream_impact": lambda rng, n, c: f"What is upstream of {ci_name(rng.randrange(c))}?",
+    "recommendations": lambda rng, n, c: f"Recommend fixes similar to INC{rng.randrange(n):07d}",
+    "open_with_health": lambda rng, n, c: "List open incidents with CI health",
+    "general": lambda rng, n, c: rng.choice(["What can you do?", "Hello there", "Who is on call today?"])
+}
+
+# Mix name -> (template, weight)
+MIXES: Dict[str, List[Tuple[str, int]]] = {
+    "lookup": [("incident_status", 5), ("dependencies", 3), ("upstream_impact", 2)],
+    "default": [
+        ("incident_status", 4), ("ci_health", 3), ("dependencies", 2), ("upstream_impact", 1),
+        ("recommendations", 1), ("general", 1)
+    ],
+    "llm": [("ci_health", 3), ("general", 1)],
+    "fanout": [("open_with_health", 1)]
+}
+
+
+def build_queries(mix: str, count: int, num_incidents: int, num_cis: int, sessions: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    names, weights = zip(*MIXES[mix])
+    return [
+        {
+            "query": TEMPLATES[name](rng, num_incidents, num_cis),
+            "session_id": f"load-{rng.randrange(sessions)}"
+        }
+        for name in rng.choices(names, weights, k=count)
+    ]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    """Current and peak RSS of ``pid`` and its children (workers), in MB.
+
+    RSS counts pages shared copy-on-write once per process; ``pss`` splits
+    them between the processes sharing them.
+    """
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as file:
+            pids.extend(int(child) for child in file.read().split())
+    except OSError:
+        pass
+    totals = {"rss": 0.0, "peak": 0.0, "pss": 0.0}
+    for member in pids:
+        try:
+            with open(f"/proc/{member}/status") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        totals["rss"] += int(line.split()[1]) / 1024
+                    elif line.startswith("VmHWM:"):
+                        totals["peak"] += int(line.split()[1]) / 1024
+            with open(f"/proc/{member}/smaps_rollup") as file:
+                for line in file:
+                    if line.startswith("Pss:"):
+                        totals["pss"] += int(line.split()[1]) / 1024
+        except OSError:
+            continue
+    return {name: round(value, 1) for name, value in totals.items()}
+
+
+def start_server(server: str, directory: str, port: int, env: Dict[str, str], workers: int = 0) -> subprocess.Popen:
+    if server == "asgi":
+        command = [sys.executable, "-m", "hypercorn", "asgi_app:app", "--bind", f"127.0.0.1:{port}"]
+        env = {**env, "PYTHONPATH": API_DIR}
+    elif server == "prefork":
+        command = [
+            sys.executable, os.path.join(API_DIR, "prefork.py"),
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)
+        ]
+        env = {**env, "PYTHONPATH": API_DIR}
+    else:
+        command = [sys.executable, "-c", FLASK_SERVER.format(api_dir=API_DIR, port=port)]
+    return subprocess.Popen(command, cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def wait_until_ready(process: subprocess.Popen, port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited during start-up:\n{process.stderr.read().decode(errors='replace')}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/metrics")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server not ready after {timeout:.0f}s")
+
+
+def replay(port: int, queries: List[Dict], concurrency: int) -> Tuple[List[float], int, float]:
+    """Send every query once across ``concurrency`` keep-alive connections."""
+    latencies: List[float] = []
+    errors = 0
+    position = 0
+    lock = threading.Lock()
+
+    def worker() -> None:
+        nonlocal position, errors
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        local: List[float] = []
+        failed = 0
+        while True:
+            with lock:
+                if position >= len(queries):
+                    break
+                body = json.dumps(queries[position])
+                position += 1
+            started = time.perf_counter()
+            try:
+                connection.request("POST", "/query", body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+            local.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def summarise(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(max(latencies, default=0.0) * 1000, 2)
+        }
+    }
+
+
+def baseline_path(args: argparse.Namespace) -> str:
+    server = f"{args.server}{args.workers or ''}" if args.server == "prefork" else args.server
+    return os.path.join(BASELINE_DIR, f"{server}-{args.mix}-{args.incidents}-c{args.concurrency}.json")
+
+
+def regressions(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    found = []
+    for name in ("p50", "p95", "p99"):
+        limit = baseline["latency_ms"][name] * (1 + tolerance)
+        if result["latency_ms"][name] > limit:
+            found.append(f"{name} {result['latency_ms'][name]} ms > {limit:.2f} ms")
+    floor = baseline["throughput_rps"] * (1 - tolerance)
+    if result["throughput_rps"] < floor:
+        found.append(f"throughput {result['throughput_rps']} rps < {floor:.2f} rps")
+    ceiling = baseline["rss_mb"]["peak"] * (1 + tolerance)
+    if result["rss_mb"]["peak"] > ceiling:
+        found.append(f"peak RSS {result['rss_mb']['peak']} MB > {ceiling:.1f} MB")
+    if result["errors"] > baseline["errors"]:
+        found.append(f"errors {result['errors']} > {baseline['errors']}")
+    return found
+
+
+def run(args: argparse.Namespace) -> Dict:
+    num_cis = args.cis or max(1, args.incidents // 2)
+    stub = start_stub_llm(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second)
+    env = {**os.environ, "OLLAMA_HOST": f"http://127.0.0.1:{stub.server_address[1]}"}
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        write_dataset(directory, args.incidents, num_cis)
+        print(f"dataset: {args.incidents} incidents, {num_cis} CIs ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+        port = free_port()
+        process = start_server(args.server, directory, port, env, args.workers)
+        try:
+            started = time.perf_counter()
+            wait_until_ready(process, port, args.startup_timeout)
+            startup = time.perf_counter() - started
+            warmup = build_queries(args.mix, args.warmup, args.incidents, num_cis, args.sessions, args.seed + 1)
+            replay(port, warmup, args.concurrency)
+            queries = build_queries(args.mix, args.requests, args.incidents, num_cis, args.sessions, args.seed)
+            llm_before = stub.requests
+            latencies, errors, elapsed = replay(port, queries, args.concurrency)
+            result = summarise(latencies, errors, elapsed)
+            result["rss_mb"] = memory_mb(process.pid)
+            result["llm_calls"] = stub.requests - llm_before
+            result["startup_s"] = round(startup, 2)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+            stub.shutdown()
+    result["config"] = {
+        "server": args.server,
+        "workers": args.workers,
+        "mix": args.mix,
+        "incidents": args.incidents,
+        "cis": num_cis,
+        "concurrency": args.concurrency,
+        "llm_latency": args.llm_latency,
+        "llm_tokens_per_second": args.llm_tokens_per_second,
+        "seed": args.seed
+    }
+    return result
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test /query against a stub LLM")
+    parser.add_argument("--server", choices=("flask", "asgi", "prefork"), default="flask")
+    parser.add_argument("--workers", type=int, default=0, help="prefork worker processes; 0 means one per core")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--incidents", type=int, default=1000, help="10^3 to 10^6")
+    parser.add_argument("--cis", type=int, default=0, help="defaults to incidents / 2")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub seconds before the first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression vs. baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    path = baseline_path(args)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(result, file, indent=2)
+            file.write("\n")
+        print(f"baseline saved to {os.path.relpath(path)}", file=sys.stderr)
+        return 0
+    if not os.path.exists(path):
+        print(f"no baseline at {os.path.relpath(path)}; run with --save-baseline to record one", file=sys.stderr)
+        return 0
+    with open(path) as file:
+        found = regressions(result, json.load(file), args.tolerance)
+    for regression in found:
+        print(f"REGRESSION: {regression}", file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
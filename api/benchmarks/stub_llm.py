@@ -0,0 +1,157 @@
+"""Stand-in for Ollama's /api/chat with a configurable latency and token rate.
+
+Intent prompts get an "Intent: ..., Sub-intent: ..." answer derived from
+keywords in the quoted query; every other prompt gets a health-style summary.
+Responses are deterministic for a given prompt, streamed as NDJSON when the
+request asks for it. Point the app at it with OLLAMA_HOST:
+
+    python -m benchmarks.stub_llm --port 11435 --latency 0.2 --tokens-per-second 40
+    OLLAMA_HOST=http://127.0.0.1:11435 python model_api.py
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+INTENT_KEYWORDS = [
+    ("similar", "Recommendations Search"),
+    ("recommend", "Recommendations Search"),
+    ("upstream", "Dependency Impact Analysis"),
+    ("downstream", "Dependency Impact Analysis"),
+    ("impact", "Dependency Impact Analysis"),
+    ("health", "CI Health Check"),
+    ("inc", "Incident Status Inquiry"),
+    ("restart", "Automation Execution")
+]
+
+HEALTH_WORDS = (
+    "The configuration item is operating within expected limits although resource usage "
+    "should be monitored closely over the next few hours to confirm the trend holds steady"
+).split()
+
+
+def intent_answer(prompt: str) -> str:
+    match = re.search(r"user query: '(.*?)'\. Provide intent", prompt, re.DOTALL)
+    query = (match.group(1) if match else "").lower()
+    intent = next((intent for keyword, intent in INTENT_KEYWORDS if keyword in query), "General Queries")
+    sub_intent = "Upstream" if "upstream" in query else "Downstream" if "downstream" in query else "None"
+    return f"Intent: {intent}, Sub-intent: {sub_intent}"
+
+
+def answer_tokens(prompt: str, max_tokens: int) -> List[str]:
+    if "Determine the primary intent" in prompt:
+        return intent_answer(prompt).split(" ")
+    length = 8 + zlib.crc32(prompt.encode("utf-8")) % max(1, max_tokens - 8)
+    return [HEALTH_WORDS[i % len(HEALTH_WORDS)] for i in range(length)]
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float, tokens_per_second: float, max_tokens: int):
+        super().__init__(address, StubLLMHandler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.max_tokens = max_tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubLLMServer
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path in ("/", "/api/version"):
+            self._send(200, json.dumps({"version": "stub"}).encode("utf-8"))
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self) -> None:
+        if self.path != "/api/chat":
+            self._send(404, b'{"error": "not found"}')
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.server.count()
+        prompt = " ".join(message.get("content", "") for message in request.get("messages", []))
+        tokens = answer_tokens(prompt, self.server.max_tokens)
+        model = request.get("model", "stub")
+        time.sleep(self.server.latency)
+        if request.get("stream", True):
+            self._stream(model, prompt, tokens)
+        else:
+            time.sleep(len(tokens) / self.server.tokens_per_second)
+            self._send(200, json.dumps(self._chunk(model, " ".join(tokens), prompt, len(tokens))).encode("utf-8"))
+
+    def _chunk(self, model: str, content: str, prompt: str, eval_count: Optional[int]) -> Dict:
+        chunk = {
+            "model": model,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": {"role": "assistant", "content": content},
+            "done": eval_count is not None
+        }
+        if eval_count is not None:
+            chunk.update({"done_reason": "stop", "prompt_eval_count": len(prompt.split()), "eval_count": eval_count})
+        return chunk
+
+    def _stream(self, model: str, prompt: str, tokens: List[str]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        interval = 1.0 / self.server.tokens_per_second
+        for index, token in enumerate(tokens):
+            time.sleep(interval)
+            self._write_chunk(self._chunk(model, token if index == 0 else " " + token, prompt, None))
+        self._write_chunk(self._chunk(model, "", prompt, len(tokens)))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, chunk: Dict) -> None:
+        data = (json.dumps(chunk) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_stub_llm(port: int = 0, latency: float = 0.2, tokens_per_second: float = 40.0,
+                   max_tokens: int = 40) -> StubLLMServer:
+    """Serve on a background thread; ``server.server_address`` has the bound port."""
+    server = StubLLMServer(("127.0.0.1", port), latency, tokens_per_second, max_tokens)
+    threading.Thread(target=server.serve_forever, name="stub-llm", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama server for benchmarks")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--max-tokens", type=int, default=40)
+    args = parser.parse_args()
+    server = StubLLMServer(("127.0.0.1", args.port), args.latency, args.tokens_per_second, args.max_tokens)
+    print(f"Stub LLM listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
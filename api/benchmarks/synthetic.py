@@ -0,0 +1,113 @@
+import json
+import os
+import random
+from typing import Dict, List, Tuple
+
+STATUSES = ["New", "Open", "In Progress", "On Hold", "Resolved", "Closed"]
+PRIORITIES = ["1-Critical", "2-High", "3-Moderate", "4-Low"]
+CI_TYPES = ["Server", "Database", "Application Server", "Load Balancer", "Storage", "Gateway"]
+HEALTH = ["Healthy", "Warning", "Critical"]
+
+# File names model_api's CONFIG expects, in generate_dataset() order
+DATA_FILES = ("servicenow_inc.json", "dashboard_mapping.json", "observability_data.json", "cmdb_data.json")
+
+
+def ci_name(index: int) -> str:
+    return f"CI-{CI_TYPES[index % len(CI_TYPES)].split()[0].upper()}-{index:07d}"
+
+
+def generate_cmdb(num_cis: int, fanout: int = 3, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    entries = []
+    for index in range(num_cis):
+        downstream = []
+        for _ in range(rng.randint(0, fanout)):
+            target = rng.randrange(num_cis)
+            if target != index:
+                downstream.append({
+                    "ci": ci_name(target),
+                    "type": CI_TYPES[target % len(CI_TYPES)],
+                    "relationship": "Depends on"
+                })
+        entries.append({
+            "ci": ci_name(index),
+            "type": CI_TYPES[index % len(CI_TYPES)],
+            "environment": "Production",
+            "upstream": [],
+            "downstream": downstream
+        })
+    by_name = {entry["ci"]: entry for entry in entries}
+    for entry in entries:
+        for dep in entry["downstream"]:
+            by_name[dep["ci"]]["upstream"].append({
+                "ci": entry["ci"],
+                "type": entry["type"],
+                "relationship": "Used by"
+            })
+    return entries
+
+
+def generate_observability(num_cis: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "ci": ci_name(index),
+            "status": rng.choice(HEALTH),
+            "cpu_usage": f"{rng.randint(1, 99)}%",
+            "memory_usage": f"{rng.randint(1, 99)}%",
+            "disk_usage": f"{rng.randint(1, 99)}%",
+            "updates": "Synthetic observability sample.",
+            "last_updated": "2023-06-15T09:10:00Z"
+        }
+        for index in range(num_cis)
+    ]
+
+
+def generate_incidents(num_incidents: int, num_cis: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    incidents = []
+    for index in range(num_incidents):
+        ci = ci_name(rng.randrange(num_cis))
+        status = rng.choice(STATUSES)
+        incidents.append({
+            "id": f"INC{index:07d}",
+            "short_description": f"Synthetic incident on {ci}",
+            "description": f"Automatically generated incident affecting {ci}.",
+            "status": status,
+            "priority": rng.choice(PRIORITIES),
+            "category": "Infrastructure",
+            "subcategory": "Server",
+            "affected_ci": ci,
+            "affected_service": f"Service {index % 50}",
+            "assigned_individual": "On Call",
+            "created_at": "2023-06-15T08:30:00Z",
+            "updated_at": f"2023-06-15T{index % 24:02d}:{index % 60:02d}:00Z",
+            "resolution_notes": "Restarted the service." if status in ("Resolved", "Closed") else ""
+        })
+    return incidents
+
+
+def generate_dashboards(num_cis: int) -> Dict[str, str]:
+    return {
+        ci_name(index).lower(): f"https://grafana.example.com/dashboards/{index}"
+        for index in range(num_cis)
+    }
+
+
+def generate_dataset(num_incidents: int, num_cis: int = 0, seed: int = 7) -> Tuple[list, Dict, list, list]:
+    num_cis = num_cis or max(1, num_incidents // 2)
+    return (
+        generate_incidents(num_incidents, num_cis, seed),
+        generate_dashboards(num_cis),
+        generate_observability(num_cis, seed),
+        generate_cmdb(num_cis, seed=seed)
+    )
+
+
+def write_dataset(directory: str, num_incidents: int, num_cis: int = 0, seed: int = 7) -> List[str]:
+    """Write a synthetic dataset under model_api's file names; returns the paths."""
+    paths = [os.path.join(directory, name) for name in DATA_FILES]
+    for path, data in zip(paths, generate_dataset(num_incidents, num_cis, seed)):
+        with open(path, 'w') as file:
+            json.dump(data, file)
+    return paths
@@ -0,0 +1,198 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Words and CI-name-like tokens; inner dots, hyphens and underscores stay in the token
+TOKEN = re.compile(r"[a-z0-9](?:[a-z0-9_.-]*[a-z0-9])?")
+DIGITS = re.compile(r"\d+")
+# 1st, 95th: numbered words, not instance numbers
+ORDINAL = re.compile(r"\d+(?:st|nd|rd|th)")
+
+# Shorter tokens are too ambiguous to correct
+MIN_FUZZY_LENGTH = 4
+# Digit buckets at least this large get character histograms to prefilter candidates
+HISTOGRAM_BUCKET = 64
+TOKEN_CHARS = np.frombuffer(b"abcdefghijklmnopqrstuvwxyz0123456789_.-", np.uint8)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+def looks_like_ci(token: str) -> bool:
+    """Letters plus a digit or separator, as in WEB-PROD-01; not a plain word, number or date."""
+    return (len(token) >= MIN_FUZZY_LENGTH and any(c.isalpha() for c in token)
+            and any(c.isdigit() or c in "-_." for c in token))
+
+
+def names_ci(token: str) -> bool:
+    """A CI-shaped token that is a name even when unknown: it carries an instance
+    number, as in WEB-PROD-01, unlike follow-up, real-time or 95th."""
+    return looks_like_ci(token) and any(c.isdigit() for c in token) and not ORDINAL.fullmatch(token.lower())
+
+
+def _max_distance(token: str) -> int:
+    return 1 if len(token) < 8 else 2
+
+
+def _histogram(token: str) -> np.ndarray:
+    counts = np.bincount(np.frombuffer(token.encode("ascii"), np.uint8), minlength=256)
+    return counts[TOKEN_CHARS].astype(np.int16)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it must exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class CIRecogniser:
+    """Finds known CI names in free text with one pass over its tokens.
+
+    The vocabulary is compiled into an Aho-Corasick automaton whose alphabet
+    is whole tokens, so matches always fall on word boundaries and a
+    multi-word name costs one state per word. Overlapping matches resolve
+    to the leftmost, then longest, name.
+
+    A CI-shaped token with no exact match is corrected to the closest name
+    within one or two edits (depending on its length), among names with the
+    same digits: instance numbers tell CIs apart and are never corrected.
+    A tie between names is left unresolved.
+    """
+
+    def __init__(self, names: Dict[str, str]):
+        # Lower-case key -> canonical name
+        self.names = names
+        self._root: Dict[str, int] = {}
+        self._goto: Dict[Tuple[int, str], int] = {}
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        self._output: List[Optional[str]] = [None]
+        self._by_digits: Dict[str, List[str]] = defaultdict(list)
+        for key, name in names.items():
+            tokens = tokenize(key)
+            if tokens:
+                self._insert(tokens, name)
+            if len(tokens) == 1:
+                self._by_digits["".join(DIGITS.findall(key))].append(tokens[0])
+        # An edit changes a histogram's L1 distance by at most two, so most of a
+        # large bucket is ruled out without computing an edit distance
+        self._histograms: Dict[str, np.ndarray] = {
+            digits: np.stack([_histogram(token) for token in bucket])
+            for digits, bucket in self._by_digits.items() if len(bucket) >= HISTOGRAM_BUCKET
+        }
+        self._link()
+
+    def _insert(self, tokens: List[str], name: str) -> None:
+        state = 0
+        for token in tokens:
+            following = self._root.get(token) if state == 0 else self._goto.get((state, token))
+            if following is None:
+                following = len(self._fail)
+                self._fail.append(0)
+                self._depth.append(self._depth[state] + 1)
+                self._output.append(None)
+                if state == 0:
+                    self._root[token] = following
+                else:
+                    self._goto[(state, token)] = following
+            state = following
+        # Names that tokenize alike: the first one (CMDB before observability and incidents) wins
+        if self._output[state] is None:
+            self._output[state] = name
+
+    def _link(self) -> None:
+        # Failure links, breadth first; states one token deep fail to the root
+        children: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+        for (state, token), following in self._goto.items():
+            children[state].append((token, following))
+        # Nearest state on the failure chain that ends a name
+        self._match_link = [0] * len(self._fail)
+        queue = list(self._root.values())
+        for state in queue:
+            for token, following in children.get(state, ()):
+                fallback = self._fail[state]
+                self._fail[following] = self._step(fallback, token)
+                target = self._fail[following]
+                self._match_link[following] = target if self._output[target] else self._match_link[target]
+                queue.append(following)
+
+    def _step(self, state: int, token: str) -> int:
+        while state:
+            following = self._goto.get((state, token))
+            if following is not None:
+                return following
+            state = self._fail[state]
+        return self._root.get(token, 0)
+
+    def find(self, text: str, fuzzy: bool = True) -> List[str]:
+        """Canonical names of every CI mentioned in ``text``, in order of first mention."""
+        return [name for name, known in self.mentions(text, fuzzy) if known]
+
+    def mentions(self, text: str, fuzzy: bool = True) -> List[Tuple[str, bool]]:
+        """(name, known) for every CI mention in order: canonical names, and CI-shaped
+        tokens that match no known name exactly or within the fuzzy distance."""
+        tokens = tokenize(text)
+        matches = []
+        state = 0
+        for end, token in enumerate(tokens):
+            state = self._step(state, token)
+            match = state if self._output[state] else self._match_link[state]
+            while match:
+                matches.append((end - self._depth[match] + 1, end + 1, self._output[match]))
+                match = self._match_link[match]
+
+        found: List[Tuple[int, str, bool]] = []
+        covered = 0
+        for start, end, name in sorted(matches, key=lambda match: (match[0], -match[1])):
+            if start >= covered:
+                found.append((start, name, True))
+                covered = end
+        matched = {index for start, end, _ in matches for index in range(start, end)}
+        for index, token in enumerate(tokens):
+            if index not in matched and looks_like_ci(token):
+                name = self.closest(token) if fuzzy else None
+                found.append((index, name, True) if name is not None else (index, token, False))
+        found.sort()
+        return list(dict.fromkeys((name, known) for _, name, known in found))
+
+    def closest(self, token: str) -> Optional[str]:
+        """The single nearest name to a one-word ``token``, or None."""
+        limit = _max_distance(token)
+        best, best_distance = None, limit + 1
+        digits = "".join(DIGITS.findall(token))
+        candidates = self._by_digits.get(digits, [])
+        if digits in self._histograms:
+            near = np.abs(self._histograms[digits] - _histogram(token)).sum(axis=1) <= 2 * limit
+            candidates = [candidates[index] for index in np.flatnonzero(near)]
+        for candidate in candidates:
+            distance = edit_distance(token, candidate, min(limit, best_distance))
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+            elif distance == best_distance and distance <= limit and candidate != best:
+                best = None
+        if best is None or best_distance > limit:
+            return None
+        return self._output[self._root[best]]
+
+    def refreshed(self, names: Dict[str, str]) -> "CIRecogniser":
+        """This recogniser if the vocabulary is unchanged, otherwise a new one."""
+        return self if names == self.names else CIRecogniser(names)
+
+    def __len__(self) -> int:
+        return len(self.names)
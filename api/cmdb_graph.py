@@ -0,0 +1,293 @@
+import threading
+from array import array
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+EMPTY = array('i')
+
+UPSTREAM = "upstream"
+DOWNSTREAM = "downstream"
+
+# (node ids in BFS order, depth per node, BFS parent per node)
+Closure = Tuple[List[int], Dict[int, int], Dict[int, int]]
+
+
+def entry_edges(entry: Dict) -> Set[Tuple[str, str]]:
+    """(upstream CI, downstream CI) pairs declared by one CMDB entry."""
+    edges = {(entry["ci"], dep["ci"]) for dep in entry.get("downstream", [])}
+    edges.update((dep["ci"], entry["ci"]) for dep in entry.get("upstream", []))
+    return edges
+
+
+def declared_edges(cmdb_data: list) -> Iterable[Tuple[str, str]]:
+    for entry in cmdb_data:
+        yield from entry_edges(entry)
+
+
+class CMDBGraph:
+    """CI dependency graph over integer ids with cached multi-hop closures.
+
+    An edge A -> B means B appears in A's ``downstream`` list (or A in B's
+    ``upstream`` list): A sends traffic to or relies on B. A failure on B
+    therefore impacts its upstream closure, and B is a candidate root cause
+    for anything in its upstream closure.
+    """
+
+    def __init__(self, closure_cache_size: int = 4096):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.adjacency: Dict[str, List[array]] = {UPSTREAM: [], DOWNSTREAM: []}
+        self.closure_cache_size = closure_cache_size
+        self._closures: "OrderedDict[Tuple[int, str, int], Closure]" = OrderedDict()
+        self._closure_members: Dict[int, Set[Tuple[int, str, int]]] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_cmdb(cls, cmdb_data: list, closure_cache_size: int = 4096) -> "CMDBGraph":
+        graph = cls(closure_cache_size)
+        add_node = graph._add_node
+        pairs = []
+        for entry in cmdb_data:
+            node = add_node(entry["ci"])
+            pairs.extend((node, add_node(dep["ci"])) for dep in entry.get("downstream", []))
+            pairs.extend((add_node(dep["ci"]), node) for dep in entry.get("upstream", []))
+        downstream: List[List[int]] = [[] for _ in graph.names]
+        upstream: List[List[int]] = [[] for _ in graph.names]
+        for source, target in set(pairs):
+            if source != target:
+                downstream[source].append(target)
+                upstream[target].append(source)
+        graph.adjacency = {
+            UPSTREAM: [array('i', sorted(neighbours)) for neighbours in upstream],
+            DOWNSTREAM: [array('i', sorted(neighbours)) for neighbours in downstream]
+        }
+        return graph
+
+    @classmethod
+    def from_adjacency(cls, names: Sequence[str], ids: Mapping[str, int], upstream: Sequence,
+                       downstream: Sequence, closure_cache_size: int = 4096) -> "CMDBGraph":
+        """Graph over prebuilt, read-only node tables, e.g. views into a snapshot.
+
+        ``copy()`` turns them back into plain lists, so updates still work.
+        """
+        graph = cls(closure_cache_size)
+        graph.names = names
+        graph.ids = ids
+        graph.adjacency = {UPSTREAM: upstream, DOWNSTREAM: downstream}
+        return graph
+
+    def copy(self) -> "CMDBGraph":
+        """Copy for applying updates while readers keep using this graph.
+
+        Adjacency arrays are shared and replaced (never mutated) on write,
+        so copying costs O(nodes + cached closures) rather than O(edges).
+        """
+        with self._lock:
+            graph = CMDBGraph(self.closure_cache_size)
+            graph.names = list(self.names)
+            graph.ids = dict(self.ids)
+            graph.adjacency = {direction: list(arrays) for direction, arrays in self.adjacency.items()}
+            graph._closures = OrderedDict(self._closures)
+            graph._closure_members = {member: set(keys) for member, keys in self._closure_members.items()}
+            return graph
+
+    def node_id(self, ci: str) -> Optional[int]:
+        return self.ids.get(ci.lower())
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _add_node(self, ci: str) -> int:
+        key = ci.lower()
+        node = self.ids.get(key)
+        if node is None:
+            node = len(self.names)
+            self.ids[key] = node
+            self.names.append(ci)
+            self.adjacency[UPSTREAM].append(EMPTY)
+            self.adjacency[DOWNSTREAM].append(EMPTY)
+        return node
+
+    def _link(self, upstream_ci: str, downstream_ci: str) -> Optional[Tuple[int, int]]:
+        source = self._add_node(upstream_ci)
+        target = self._add_node(downstream_ci)
+        if source == target or target in self.adjacency[DOWNSTREAM][source]:
+            return None
+        self._set_neighbours(DOWNSTREAM, source, list(self.adjacency[DOWNSTREAM][source]) + [target])
+        self._set_neighbours(UPSTREAM, target, list(self.adjacency[UPSTREAM][target]) + [source])
+        return source, target
+
+    def _set_neighbours(self, direction: str, node: int, neighbours: List[int]) -> None:
+        self.adjacency[direction][node] = array('i', neighbours)
+
+    def add_edge(self, upstream_ci: str, downstream_ci: str) -> None:
+        with self._lock:
+            edge = self._link(upstream_ci, downstream_ci)
+            if edge:
+                self._invalidate_edge(*edge)
+
+    def remove_edge(self, upstream_ci: str, downstream_ci: str) -> None:
+        with self._lock:
+            source, target = self.node_id(upstream_ci), self.node_id(downstream_ci)
+            if source is None or target is None or target not in self.adjacency[DOWNSTREAM][source]:
+                return
+            self._set_neighbours(DOWNSTREAM, source, [n for n in self.adjacency[DOWNSTREAM][source] if n != target])
+            self._set_neighbours(UPSTREAM, target, [n for n in self.adjacency[UPSTREAM][target] if n != source])
+            self._invalidate_edge(source, target)
+
+    def _invalidate_edge(self, source: int, target: int) -> None:
+        # Only closures that reach the edge's endpoints can change
+        stale = set(self._closure_members.get(source, ())) | set(self._closure_members.get(target, ()))
+        for key in stale:
+            node, direction, _ = key
+            if direction == DOWNSTREAM and (node == source or source in self._closures[key][1]):
+                self._drop_closure(key)
+            elif direction == UPSTREAM and (node == target or target in self._closures[key][1]):
+                self._drop_closure(key)
+
+    def _drop_closure(self, key: Tuple[int, str, int]) -> None:
+        closure = self._closures.pop(key, None)
+        if closure is None:
+            return
+        for member in closure[0]:
+            keys = self._closure_members.get(member)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._closure_members[member]
+
+    def _closure(self, node: int, direction: str, max_depth: int) -> Closure:
+        key = (node, direction, max_depth)
+        with self._lock:
+            cached = self._closures.get(key)
+            if cached is not None:
+                self._closures.move_to_end(key)
+                return cached
+            adjacency = self.adjacency[direction]
+            order: List[int] = [node]
+            depths: Dict[int, int] = {node: 0}
+            parents: Dict[int, int] = {}
+            queue = deque([node])
+            while queue:
+                current = queue.popleft()
+                depth = depths[current]
+                if max_depth >= 0 and depth >= max_depth:
+                    continue
+                for neighbour in adjacency[current]:
+                    if neighbour not in depths:
+                        depths[neighbour] = depth + 1
+                        parents[neighbour] = current
+                        order.append(neighbour)
+                        queue.append(neighbour)
+            closure = (order, depths, parents)
+            self._closures[key] = closure
+            for member in order:
+                self._closure_members.setdefault(member, set()).add(key)
+            while len(self._closures) > self.closure_cache_size:
+                self._drop_closure(next(iter(self._closures)))
+            return closure
+
+    def closure(self, ci: str, direction: str, max_depth: int = -1) -> List[Dict]:
+        """All CIs reachable from ``ci`` in ``direction``, nearest first."""
+        node = self.node_id(ci)
+        if node is None:
+            return []
+        order, depths, parents = self._closure(node, direction, max_depth)
+        return [
+            {"ci": self.names[member], "depth": depths[member], "path": self._path(parents, member)}
+            for member in order[1:]
+        ]
+
+    def within(self, cis: Iterable[str], direction: str, max_depth: int = -1) -> Set[str]:
+        """Lower-case names of every CI within ``max_depth`` hops of any of ``cis``."""
+        adjacency = self.adjacency[direction]
+        frontier = [node for node in (self.node_id(ci) for ci in cis) if node is not None]
+        seen = set(frontier)
+        depth = 0
+        while frontier and (max_depth < 0 or depth < max_depth):
+            next_frontier = []
+            for current in frontier:
+                for neighbour in adjacency[current]:
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+            depth += 1
+        return {self.names[node].lower() for node in seen}
+
+    def _path(self, parents: Dict[int, int], node: int) -> List[str]:
+        path = [node]
+        while path[-1] in parents:
+            path.append(parents[path[-1]])
+        return [self.names[member] for member in reversed(path)]
+
+    def shortest_path(self, source_ci: str, target_ci: str, direction: str = DOWNSTREAM) -> Optional[List[str]]:
+        source, target = self.node_id(source_ci), self.node_id(target_ci)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [self.names[source]]
+        reverse = UPSTREAM if direction == DOWNSTREAM else DOWNSTREAM
+        forward_adj, backward_adj = self.adjacency[direction], self.adjacency[reverse]
+        # Bidirectional BFS: expand the smaller frontier until the searches meet
+        forward_parents: Dict[int, int] = {source: -1}
+        backward_parents: Dict[int, int] = {target: -1}
+        forward, backward = [source], [target]
+        while forward and backward:
+            expand_forward = len(forward) <= len(backward)
+            frontier = forward if expand_forward else backward
+            adjacency = forward_adj if expand_forward else backward_adj
+            seen, other = (forward_parents, backward_parents) if expand_forward else (backward_parents, forward_parents)
+            next_frontier = []
+            for current in frontier:
+                for neighbour in adjacency[current]:
+                    if neighbour in seen:
+                        continue
+                    seen[neighbour] = current
+                    if neighbour in other:
+                        return self._join_paths(forward_parents, backward_parents, neighbour)
+                    next_frontier.append(neighbour)
+            if expand_forward:
+                forward = next_frontier
+            else:
+                backward = next_frontier
+        return None
+
+    def _join_paths(self, forward_parents: Dict[int, int], backward_parents: Dict[int, int], meeting: int) -> List[str]:
+        path = []
+        node = meeting
+        while node != -1:
+            path.append(node)
+            node = forward_parents[node]
+        path.reverse()
+        node = backward_parents[meeting]
+        while node != -1:
+            path.append(node)
+            node = backward_parents[node]
+        return [self.names[member] for member in path]
+
+    def shared_root_causes(self, incident_cis: Dict[str, str], max_depth: int = -1) -> List[Dict]:
+        """Group incidents whose CIs depend (directly or transitively) on a common CI.
+
+        ``incident_cis`` maps incident id to affected CI. Groups are ordered by
+        how many incidents the candidate root cause explains, then by distance.
+        """
+        candidates: Dict[int, Dict[str, int]] = {}
+        for incident_id, ci in incident_cis.items():
+            node = self.node_id(ci)
+            if node is None:
+                continue
+            order, depths, _ = self._closure(node, DOWNSTREAM, max_depth)
+            for member in order:
+                candidates.setdefault(member, {})[incident_id] = depths[member]
+        groups = [
+            {
+                "root_ci": self.names[member],
+                "incidents": sorted(incidents),
+                "total_distance": sum(incidents.values())
+            }
+            for member, incidents in candidates.items()
+            if len(incidents) > 1
+        ]
+        groups.sort(key=lambda group: (-len(group["incidents"]), group["total_distance"], group["root_ci"]))
+        return groups
@@ -0,0 +1,200 @@
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ci_recogniser import CIRecogniser
+from cmdb_graph import CMDBGraph, entry_edges
+from open_incident_view import OpenIncidentView
+
+CLOSED_STATUSES = ("resolved", "closed")
+
+
+def _status_key(incident: Dict) -> Optional[str]:
+    return incident.get("status", "").lower()
+
+
+def _ci_key(incident: Dict) -> Optional[str]:
+    return incident["affected_ci"].lower() if incident.get("affected_ci") else None
+
+
+def _open_key(incident: Dict) -> Optional[str]:
+    return "open" if _status_key(incident) not in CLOSED_STATUSES else None
+
+
+def _patch_groups(groups: Dict[str, List[Dict]], old: List[Dict], new: List[Dict],
+                  key_func: Callable[[Dict], Optional[str]]) -> Dict[str, List[Dict]]:
+    """Copy-on-write update of a grouped index: only touched groups are copied."""
+    patched = dict(groups)
+    copied: Set[str] = set()
+
+    def group(key: str) -> List[Dict]:
+        if key not in copied:
+            patched[key] = list(patched.get(key, []))
+            copied.add(key)
+        return patched[key]
+
+    for record in old:
+        key = key_func(record)
+        if key is not None:
+            members = group(key)
+            members[:] = [member for member in members if member is not record]
+    for record in new:
+        key = key_func(record)
+        if key is not None:
+            group(key).append(record)
+    for key in copied:
+        if not patched[key]:
+            del patched[key]
+    return patched
+
+
+class DataStore:
+    """In-memory view of the ServiceNow, dashboard, observability and CMDB data.
+
+    Case-insensitive hash indexes are built once when the data is loaded so
+    every lookup made while answering a query is O(1) instead of a scan.
+    A store is never modified after construction; the ``with_*`` methods
+    return a new store that shares every index the update did not touch.
+    """
+
+    def __init__(self, servicenow_data: list, dashboards: Dict, observability_data: list, cmdb_data: list):
+        self.servicenow_data = servicenow_data or []
+        self.dashboards = dashboards or {}
+        self.observability_data = observability_data or []
+        self.cmdb_data = cmdb_data or []
+        self._build_indexes()
+        self.graph = CMDBGraph.from_cmdb(self.cmdb_data)
+        self.open_view = OpenIncidentView.build(self.open_incident_list, self)
+        self.ci_recogniser = CIRecogniser(self.ci_names())
+
+    def _build_indexes(self) -> None:
+        self.incidents_by_id: Dict[str, Dict] = {}
+        self.incidents_by_status: Dict[str, List[Dict]] = defaultdict(list)
+        self.incidents_by_ci: Dict[str, List[Dict]] = defaultdict(list)
+        self.open_incident_list: List[Dict] = []
+        for incident in self.servicenow_data:
+            self.incidents_by_id[incident["id"].lower()] = incident
+            status = incident.get("status", "").lower()
+            self.incidents_by_status[status].append(incident)
+            if incident.get("affected_ci"):
+                self.incidents_by_ci[incident["affected_ci"].lower()].append(incident)
+            if status not in CLOSED_STATUSES:
+                self.open_incident_list.append(incident)
+
+        self.observability_by_ci: Dict[str, Dict] = {
+            entry["ci"].lower(): entry for entry in self.observability_data
+        }
+        self.cmdb_by_ci: Dict[str, Dict] = {
+            entry["ci"].lower(): entry for entry in self.cmdb_data
+        }
+
+    def is_complete(self) -> bool:
+        return all([self.servicenow_data, self.dashboards, self.observability_data, self.cmdb_data])
+
+    def get_incident(self, incident_id: str) -> Optional[Dict]:
+        return self.incidents_by_id.get(incident_id.lower())
+
+    def get_observability(self, ci: str) -> Optional[Dict]:
+        return self.observability_by_ci.get(ci.lower())
+
+    def get_cmdb_entry(self, ci: str) -> Optional[Dict]:
+        return self.cmdb_by_ci.get(ci.lower())
+
+    def get_dashboard_link(self, ci: str) -> str:
+        return self.dashboards.get(ci.lower(), "No dashboard available")
+
+    def incidents_with_status(self, statuses: Iterable[str]) -> List[Dict]:
+        incidents = []
+        for status in statuses:
+            incidents.extend(self.incidents_by_status.get(status.lower(), []))
+        return incidents
+
+    def incidents_for_ci(self, ci: str) -> List[Dict]:
+        return self.incidents_by_ci.get(ci.lower(), [])
+
+    def open_incidents(self) -> List[Dict]:
+        return self.open_incident_list
+
+    def observability_entries(self) -> Iterable[Dict]:
+        return self.observability_data
+
+    def ci_names(self) -> Dict[str, str]:
+        """Every known CI by lower-case name: CMDB spelling first, then observability, then incidents."""
+        names = {name.lower(): name for name in self.graph.names}
+        for key, entry in self.observability_by_ci.items():
+            names.setdefault(key, entry["ci"])
+        for key, incidents in self.incidents_by_ci.items():
+            names.setdefault(key, incidents[0]["affected_ci"])
+        return names
+
+    def _derive(self, **attributes) -> "DataStore":
+        store = object.__new__(DataStore)
+        store.__dict__.update(self.__dict__)
+        store.__dict__.update(attributes)
+        return store
+
+    def with_servicenow_data(self, servicenow_data: list) -> Tuple["DataStore", Set[str]]:
+        by_id = {incident["id"].lower(): incident for incident in servicenow_data}
+        changed = {key for key, incident in by_id.items() if self.incidents_by_id.get(key) != incident}
+        changed.update(self.incidents_by_id.keys() - by_id.keys())
+        if not changed:
+            return self, changed
+        old = [self.incidents_by_id[key] for key in changed if key in self.incidents_by_id]
+        new = [by_id[key] for key in changed if key in by_id]
+        store = self._derive(
+            servicenow_data=servicenow_data,
+            incidents_by_id=by_id,
+            incidents_by_status=_patch_groups(self.incidents_by_status, old, new, _status_key),
+            incidents_by_ci=_patch_groups(self.incidents_by_ci, old, new, _ci_key),
+            open_incident_list=_patch_groups({"open": self.open_incident_list}, old, new, _open_key).get("open", [])
+        )
+        store.open_view = self.open_view.patch(changed, [incident for incident in new if _open_key(incident)], store)
+        store.ci_recogniser = self.ci_recogniser.refreshed(store.ci_names())
+        return store, changed
+
+    def with_observability_data(self, observability_data: list) -> Tuple["DataStore", Set[str]]:
+        by_ci = {entry["ci"].lower(): entry for entry in observability_data}
+        changed = {key for key, entry in by_ci.items() if self.observability_by_ci.get(key) != entry}
+        changed.update(self.observability_by_ci.keys() - by_ci.keys())
+        if not changed:
+            return self, changed
+        store = self._derive(observability_data=observability_data, observability_by_ci=by_ci)
+        store.open_view = self.open_view.refresh_cis(changed, store)
+        store.ci_recogniser = self.ci_recogniser.refreshed(store.ci_names())
+        return store, changed
+
+    def with_cmdb_data(self, cmdb_data: list) -> Tuple["DataStore", Set[str]]:
+        by_ci = {entry["ci"].lower(): entry for entry in cmdb_data}
+        changed = {key for key, entry in by_ci.items() if self.cmdb_by_ci.get(key) != entry}
+        changed.update(self.cmdb_by_ci.keys() - by_ci.keys())
+        if not changed:
+            return self, changed
+
+        def declared(edge: Tuple[str, str]) -> bool:
+            # An edge stays while either endpoint's entry still declares it
+            wanted = (edge[0].lower(), edge[1].lower())
+            return any(
+                wanted in {(u.lower(), d.lower()) for u, d in entry_edges(by_ci[ci])}
+                for ci in wanted if ci in by_ci
+            )
+
+        graph = self.graph.copy()
+        for key in changed:
+            old_edges = entry_edges(self.cmdb_by_ci[key]) if key in self.cmdb_by_ci else set()
+            new_edges = entry_edges(by_ci[key]) if key in by_ci else set()
+            for upstream_ci, downstream_ci in old_edges - new_edges:
+                if not declared((upstream_ci, downstream_ci)):
+                    graph.remove_edge(upstream_ci, downstream_ci)
+            for upstream_ci, downstream_ci in new_edges - old_edges:
+                graph.add_edge(upstream_ci, downstream_ci)
+        store = self._derive(cmdb_data=cmdb_data, cmdb_by_ci=by_ci, graph=graph)
+        store.ci_recogniser = self.ci_recogniser.refreshed(store.ci_names())
+        return store, changed
+
+    def with_dashboards(self, dashboards: Dict) -> Tuple["DataStore", Set[str]]:
+        changed = {key for key, link in dashboards.items() if self.dashboards.get(key) != link}
+        changed.update(self.dashboards.keys() - dashboards.keys())
+        if not changed:
+            return self, changed
+        store = self._derive(dashboards=dashboards)
+        store.open_view = self.open_view.refresh_cis({key.lower() for key in changed}, store)
+        return store, changed
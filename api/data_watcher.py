@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from data_store import DataStore
+
+logger = logging.getLogger(__name__)
+
+# CONFIG key of each watched file and the DataStore method that applies it
+WATCHED_FILES = [
+    ("servicenow_file", "with_servicenow_data"),
+    ("dashboards_file", "with_dashboards"),
+    ("observability_file", "with_observability_data"),
+    ("cmdb_file", "with_cmdb_data")
+]
+
+ChangeListener = Callable[[str, DataStore, DataStore, Set[str]], None]
+
+
+def load_json_file(path: str) -> Any:
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+class DataWatcher:
+    """Polls the JSON data files and swaps in an updated DataStore when they change.
+
+    Files are re-parsed on the watcher thread, never on the request path.
+    Readers take ``watcher.store`` once per request; the reference is replaced
+    in a single assignment, so a query sees either the old or the new data.
+    """
+
+    def __init__(self, config: Dict, store: DataStore, interval: float = 5.0,
+                 loaders: Optional[Dict[str, Callable[[str], Any]]] = None):
+        self.config = config
+        self.loaders = loaders or {}
+        self.store = store
+        self.interval = interval
+        self.listeners: List[ChangeListener] = []
+        self.reloads = 0
+        self.errors = 0
+        self._signatures: Dict[str, Optional[Tuple[int, int]]] = {
+            key: self._signature(config[key]) for key, _ in WATCHED_FILES
+        }
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        self.listeners.append(listener)
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling and wait for the thread; start() may be called again afterwards."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stop = threading.Event()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def poll(self) -> None:
+        for key, method in WATCHED_FILES:
+            path = self.config[key]
+            signature = self._signature(path)
+            if signature is None or signature == self._signatures[key]:
+                continue
+            try:
+                data = self.loaders.get(key, load_json_file)(path)
+            except (OSError, ValueError):
+                # Most likely caught mid-write; retry on the next poll
+                self.errors += 1
+                continue
+            old_store = self.store
+            try:
+                new_store, changed = getattr(old_store, method)(data)
+            except (AttributeError, KeyError, TypeError):
+                # Malformed records; the file is retried on every poll until it applies
+                self.errors += 1
+                logger.exception("reload of %s failed", path)
+                continue
+            self._signatures[key] = signature
+            if new_store is old_store:
+                continue
+            self.store = new_store
+            self.reloads += 1
+            for listener in self.listeners:
+                # A failing listener must not stop the reload or the watcher thread
+                try:
+                    listener(key, old_store, new_store, changed)
+                except Exception:
+                    self.errors += 1
+                    logger.exception("reload of %s failed", path)
+
+    def stats(self) -> Dict[str, int]:
+        return {"reloads": self.reloads, "errors": self.errors}
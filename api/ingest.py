@@ -0,0 +1,163 @@
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Type
+
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\r\n"
+
+
+class CompactRecord:
+    """Read-only record holding only the fields the query pipeline uses.
+
+    Supports the dict-style access (``record["id"]``, ``record.get(...)``,
+    ``"field" in record``) used throughout model_api.py, so it can stand in
+    for the parsed JSON dict at a fraction of the memory.
+    """
+
+    __slots__ = ()
+    FIELDS: tuple = ()
+    INTERNED: frozenset = frozenset()
+
+    def __init__(self, data: Dict[str, Any]):
+        for field in self.FIELDS:
+            value = data.get(field)
+            if field in self.INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, field: str) -> Any:
+        value = getattr(self, field, None) if field in self.FIELDS else None
+        if value is None:
+            raise KeyError(field)
+        return value
+
+    def get(self, field: str, default: Any = None) -> Any:
+        value = getattr(self, field, None) if field in self.FIELDS else None
+        return default if value is None else value
+
+    def __contains__(self, field: str) -> bool:
+        return self.get(field) is not None
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, CompactRecord):
+            return type(self) is type(other) and self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == {field: other.get(field) for field in self.FIELDS}
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, field) for field in self.FIELDS))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class IncidentRecord(CompactRecord):
+    FIELDS = (
+        "id", "short_description", "description", "status", "priority",
+        "affected_ci", "affected_service", "updated_at", "resolution_notes"
+    )
+    INTERNED = frozenset({"status", "priority", "affected_ci", "affected_service"})
+    __slots__ = FIELDS
+
+
+class ObservabilityRecord(CompactRecord):
+    FIELDS = ("ci", "status", "cpu_usage", "memory_usage", "disk_usage", "updates", "last_updated")
+    INTERNED = frozenset({"ci", "status"})
+    __slots__ = FIELDS
+
+
+def _iter_json_array(file: TextIO, first_chunk: str) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buffer = first_chunk
+    pos = buffer.index("[") + 1
+    eof = False
+
+    def refill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = file.read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    while True:
+        while pos < len(buffer) and (buffer[pos] in _WHITESPACE or buffer[pos] == ","):
+            pos += 1
+        if pos >= len(buffer):
+            if not refill():
+                raise json.JSONDecodeError("Unterminated JSON array", buffer, pos)
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof or not refill():
+                raise
+            continue
+        if end == len(buffer) and not eof and refill():
+            # A value ending exactly at the chunk boundary may be truncated
+            continue
+        pos = end
+        yield value
+
+
+def _iter_json_lines(file: TextIO, first_chunk: str) -> Iterator[Any]:
+    pending = first_chunk
+    for line in file:
+        if pending:
+            line, pending = pending + line, ""
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def iter_json_records(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield records one at a time from a JSON array or JSON Lines file."""
+    with open(file_path, 'r') as file:
+        first_chunk = ""
+        while not first_chunk.strip():
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            first_chunk += chunk
+        if first_chunk.lstrip().startswith("["):
+            yield from _iter_json_array(file, first_chunk)
+        else:
+            # The first chunk may end mid-line; complete it from the file
+            head, _, tail = first_chunk.rpartition("\n")
+            for line in head.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+            yield from _iter_json_lines(file, tail)
+
+
+def load_records(file_path: str, record_type: Optional[Type[CompactRecord]] = None) -> List[Any]:
+    if record_type is None:
+        return list(iter_json_records(file_path))
+    return [record_type(data) for data in iter_json_records(file_path)]
+
+
+def source_signature(paths: Sequence[str]) -> Dict[str, List[int]]:
+    """(mtime_ns, size) of each existing file, to tell whether derived data is stale."""
+    signature = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature[path] = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            continue
+    return signature
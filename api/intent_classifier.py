@@ -0,0 +1,73 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Pattern, Tuple
+
+INTENTS = [
+    "Incident Status Inquiry",
+    "CI Health Check",
+    "Dependency Impact Analysis",
+    "Recommendations Search",
+    "Automation Execution",
+    "List Open Incidents with CI Health",
+    "General Queries"
+]
+
+MIN_SCORE = 2.0
+MIN_MARGIN = 1.0
+
+# (intent, pattern, weight); every matching pattern adds its weight to the intent
+RULES: List[Tuple[str, Pattern, float]] = [
+    ("Incident Status Inquiry", re.compile(r"\binc\d+\b"), 2.0),
+    ("Incident Status Inquiry", re.compile(r"\b(status|details?|about|update)\b.*\binc\d+\b|\binc\d+\b.*\b(status|details?)\b"), 1.0),
+    ("Incident Status Inquiry", re.compile(r"\b(open|active|current) incidents?\b"), 2.0),
+    ("CI Health Check", re.compile(r"\b(health|healthy|unhealthy)\b"), 3.0),
+    ("CI Health Check", re.compile(r"\b(status|staus)\b"), 1.5),
+    ("CI Health Check", re.compile(r"\b(cpu|memory|disk|utili[sz]ation)\b"), 2.0),
+    ("Dependency Impact Analysis", re.compile(r"\b(upstream|downstream|dependencies|dependency|depends|blast radius|impacted by|impact of)\b"), 4.0),
+    ("Recommendations Search", re.compile(r"\b(recommend\w*|suggest\w*|similar|how (do|can|to) (i |we )?(fix|resolve)|resolution)\b"), 4.0),
+    ("Automation Execution", re.compile(r"\b(restart|reboot|automate|automation|remediate|scale (up|out|down))\b"), 4.0),
+    # "run a health check": a bare run or execute must not outweigh what is being run
+    ("Automation Execution", re.compile(r"\b(run|execute)\b"), 2.0),
+    ("List Open Incidents with CI Health", re.compile(r"\b(open|active|all) incidents?\b.*\b(health|healthy|ci health)\b"), 6.0),
+    ("General Queries", re.compile(r"^(hi|hello|hey|thanks|thank you|help|who are you|what can you do)\b"), 3.0)
+]
+
+SUB_INTENT_RULES: List[Tuple[str, Pattern]] = [
+    ("Upstream", re.compile(r"\bupstream\b")),
+    ("Downstream", re.compile(r"\bdownstream\b"))
+]
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+def normalise_query(user_query: str) -> str:
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", user_query.strip().lower()))
+
+
+def score_intents(user_query: str) -> Dict[str, float]:
+    text = normalise_query(user_query)
+    scores: Dict[str, float] = defaultdict(float)
+    for intent, pattern, weight in RULES:
+        if pattern.search(text):
+            scores[intent] += weight
+    return scores
+
+
+def classify_intent(user_query: str) -> Optional[Tuple[str, str]]:
+    """Return (intent, sub_intent) when the rules are confident, otherwise None."""
+    scores = score_intents(user_query)
+    if not scores:
+        return None
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    intent, top_score = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    if top_score < MIN_SCORE or top_score - runner_up < MIN_MARGIN:
+        return None
+    sub_intent = "None"
+    if intent == "Dependency Impact Analysis":
+        text = normalise_query(user_query)
+        matches = [name for name, pattern in SUB_INTENT_RULES if pattern.search(text)]
+        if len(matches) == 1:
+            sub_intent = matches[0]
+    return intent, sub_intent
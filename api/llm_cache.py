@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at if expires_at is not None else time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def items(self):
+        with self._lock:
+            now = time.time()
+            return [(key, value, expires_at) for key, (value, expires_at) in self._entries.items() if expires_at >= now]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class SQLiteCache:
+    """LRUCache's interface over a local SQLite file shared by worker processes.
+
+    Values must be JSON-serialisable; tuples come back as lists. Entries are
+    pruned to ``max_entries`` (least recently set first) at most once per
+    PRUNE_INTERVAL. Hit and miss counts are per process.
+    """
+
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 1024, ttl: float = 300.0):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_prune = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT, key TEXT, value TEXT, expires_at REAL, PRIMARY KEY (namespace, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (namespace, expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at >= ?",
+            (self.namespace, str(key), time.time())
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, str(key), json.dumps(value), expires_at if expires_at is not None else now + self.ttl)
+            )
+        if now - self._last_prune > self.PRUNE_INTERVAL:
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        self._last_prune = now
+        with self._connection() as connection:
+            connection.execute("DELETE FROM cache WHERE namespace = ? AND expires_at < ?", (self.namespace, now))
+            # Every entry has the same ttl, so the earliest to expire is the least recently set
+            cursor = connection.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_entries)
+            )
+            self.evictions += cursor.rowcount
+
+    def delete(self, key: Hashable) -> bool:
+        with self._connection() as connection:
+            cursor = connection.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, str(key)))
+        return cursor.rowcount > 0
+
+    def clear(self) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def items(self):
+        rows = self._connection().execute(
+            "SELECT key, value, expires_at FROM cache WHERE namespace = ? AND expires_at >= ?",
+            (self.namespace, time.time())
+        ).fetchall()
+        return [(key, json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def __len__(self) -> int:
+        (count,) = self._connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+def create_cache(config: Dict, namespace: str, max_entries: int, ttl: float):
+    if config.get("cache_backend") == "sqlite":
+        return SQLiteCache(config["cache_db_file"], namespace, max_entries, ttl)
+    return LRUCache(max_entries, ttl)
+
+
+class HealthSummaryCache:
+    """Caches LLM health summaries keyed by a hash of the model and prompt inputs.
+
+    The last key seen for each CI is remembered, so a new metrics snapshot for
+    that CI drops the summary generated for the previous one.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0, persist_path: Optional[str] = None,
+                 cache=None):
+        self._cache = cache if cache is not None else LRUCache(max_entries, ttl)
+        self._ci_keys: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.persist_path = persist_path
+        self.invalidations = 0
+        if persist_path:
+            self._load()
+
+    @staticmethod
+    def make_key(model: str, inputs: Dict[str, Any]) -> str:
+        payload = json.dumps([model, inputs], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, ci: str, model: str, inputs: Dict[str, Any]) -> Optional[str]:
+        key = self.make_key(model, inputs)
+        self._observe(ci.lower(), key)
+        entry = self._cache.get(key)
+        return entry[1] if entry else None
+
+    def put(self, ci: str, model: str, inputs: Dict[str, Any], message: str) -> None:
+        key = self.make_key(model, inputs)
+        self._observe(ci.lower(), key)
+        self._cache.set(key, (ci.lower(), message))
+        if self.persist_path:
+            self._save()
+
+    def invalidate(self, ci: str) -> None:
+        with self._lock:
+            key = self._ci_keys.pop(ci.lower(), None)
+        if key is not None and self._cache.delete(key):
+            self.invalidations += 1
+
+    def _observe(self, ci: str, key: str) -> None:
+        with self._lock:
+            previous = self._ci_keys.get(ci)
+            self._ci_keys[ci] = key
+        if previous is not None and previous != key and self._cache.delete(previous):
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._cache.stats()
+        stats["invalidations"] = self.invalidations
+        return stats
+
+    def _load(self) -> None:
+        try:
+            with open(self.persist_path, 'r') as file:
+                entries = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = time.time()
+        for key, ci, message, expires_at in entries:
+            if expires_at >= now:
+                self._cache.set(key, (ci, message), expires_at)
+                self._ci_keys[ci] = key
+
+    def _save(self) -> None:
+        entries = [[key, ci, message, expires_at] for key, (ci, message), expires_at in self._cache.items()]
+        with self._lock:
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'w') as file:
+                json.dump(entries, file)
+            os.replace(tmp_path, self.persist_path)
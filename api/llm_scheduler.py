@@ -0,0 +1,319 @@
+import asyncio
+import heapq
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextvars import Context, copy_context
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics import LLM_ERRORS, REGISTRY, llm_call
+
+# Lower runs first: a user waiting on intent detection beats bulk health fan-out
+PRIORITY_INTERACTIVE = 0
+PRIORITY_HEALTH = 1
+PRIORITY_BACKGROUND = 2
+
+
+class LLMUnavailable(Exception):
+    """The call was not made or did not finish in time; callers fall back to raw data."""
+
+
+class LLMStalled(LLMUnavailable):
+    """A streamed call went quiet between chunks or ran past its deadline."""
+
+
+# Ends a streamed flight's chunk queue
+_END = object()
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after ``reset_timeout`` lets one probe through."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+class _Flight:
+    __slots__ = ("key", "prompt", "kind", "deadline", "future", "context", "failed", "waiters", "chunks", "started")
+
+    def __init__(self, key: Tuple[str, str], prompt: str, kind: str, deadline: float, context: Context,
+                 chunks: Optional[queue.Queue] = None):
+        self.key = key
+        self.prompt = prompt
+        self.kind = kind
+        self.deadline = deadline
+        self.future: Future = Future()
+        self.context = context
+        self.failed = False
+        # Callers still waiting on the result; the leader counts as one
+        self.waiters = 1
+        # Streamed calls hand each chunk to their caller through this queue
+        self.chunks = chunks
+        self.started: Optional[float] = None
+
+
+class LLMScheduler:
+    """Single entry point for blocking LLM calls.
+
+    Identical prompts already queued or running share one call. Calls run
+    on ``max_concurrency`` worker threads in priority order. Each caller
+    waits at most ``timeout`` seconds. Failures and timeouts feed a circuit
+    breaker: while it is open, calls fail immediately with LLMUnavailable
+    instead of queueing behind a dead model.
+
+    Streamed calls take a worker slot too, but are never shared. Besides the
+    deadline, their caller gives up once ``idle_timeout`` seconds pass without
+    a chunk; the worker stays blocked on the model until it answers or its
+    client times out, but stops forwarding chunks.
+    """
+
+    def __init__(self, call: Callable[[str], Any], model: str, max_concurrency: int = 4,
+                 max_queue: int = 256, timeout: float = 30.0, breaker: Optional[CircuitBreaker] = None,
+                 stream_call: Optional[Callable[[str], Iterable[Any]]] = None, idle_timeout: float = 10.0):
+        self.call = call
+        self.stream_call = stream_call
+        self.idle_timeout = idle_timeout
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.coalesced = 0
+        self.rejected = 0
+        self._queue: List[Tuple[int, int, _Flight]] = []
+        self._in_flight: Dict[Tuple[str, str], _Flight] = {}
+        self._sequence = itertools.count()
+        self._ready = threading.Condition()
+        self._workers: List[threading.Thread] = []
+
+    def _start_workers(self) -> None:
+        while len(self._workers) < self.max_concurrency:
+            worker = threading.Thread(target=self._run, name=f"llm-worker-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def chat(self, prompt: str, kind: str, priority: int = PRIORITY_HEALTH, timeout: Optional[float] = None) -> Any:
+        """Return the model's response to ``prompt`` or raise LLMUnavailable."""
+        return self.wait(self.submit(prompt, kind, priority, timeout), timeout)
+
+    def submit(self, prompt: str, kind: str, priority: int = PRIORITY_HEALTH, timeout: Optional[float] = None) -> _Flight:
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        key = (self.model, prompt)
+        with self._ready:
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                flight.waiters += 1
+                flight.deadline = max(flight.deadline, deadline)
+                return flight
+            # The leader's context carries its request trace into the worker thread
+            flight = _Flight(key, prompt, kind, deadline, copy_context())
+            self._enqueue(flight, priority)
+            self._in_flight[key] = flight
+            return flight
+
+    def _enqueue(self, flight: _Flight, priority: int) -> None:
+        # Called holding self._ready
+        if not self.breaker.allow():
+            self.rejected += 1
+            LLM_ERRORS.inc(kind=flight.kind, error="circuit_open")
+            raise LLMUnavailable("LLM circuit breaker is open")
+        if len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            LLM_ERRORS.inc(kind=flight.kind, error="queue_full")
+            raise LLMUnavailable("LLM queue is full")
+        heapq.heappush(self._queue, (priority, next(self._sequence), flight))
+        self._start_workers()
+        self._ready.notify()
+
+    def stream(self, prompt: str, kind: str, priority: int = PRIORITY_HEALTH, timeout: Optional[float] = None,
+               idle_timeout: Optional[float] = None) -> Iterator[Any]:
+        """Yield the chunks of ``stream_call(prompt)`` as they arrive.
+
+        Raises LLMUnavailable if the call is rejected, and LLMStalled once it
+        passes its deadline or, after it has started, ``idle_timeout`` seconds
+        go by without a chunk.
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        idle_timeout = self.idle_timeout if idle_timeout is None else idle_timeout
+        flight = _Flight((self.model, prompt), prompt, kind, deadline, copy_context(), queue.Queue())
+        with self._ready:
+            self._enqueue(flight, priority)
+        finished = False
+        last_chunk = 0.0
+        try:
+            while True:
+                # Until the call starts only the deadline applies
+                limit = flight.deadline
+                if flight.started is not None:
+                    limit = min(limit, max(flight.started, last_chunk) + idle_timeout)
+                try:
+                    item = flight.chunks.get(timeout=max(0.0, min(limit - time.monotonic(), idle_timeout)))
+                except queue.Empty:
+                    now = time.monotonic()
+                    if now >= flight.deadline:
+                        error = "deadline"
+                    elif flight.started is not None and now >= max(flight.started, last_chunk) + idle_timeout:
+                        error = "stalled"
+                    else:
+                        continue
+                    finished = True
+                    self._fail(flight, error)
+                    raise LLMStalled(f"LLM stream {'exceeded its deadline' if error == 'deadline' else 'stalled'}")
+                if item is _END:
+                    finished = True
+                    return
+                if isinstance(item, BaseException):
+                    finished = True
+                    raise item
+                last_chunk = time.monotonic()
+                yield item
+        finally:
+            if not finished:
+                # The caller stopped reading; the worker drops the rest without blaming the model
+                with self._ready:
+                    flight.failed = True
+
+    def wait(self, flight: _Flight, timeout: Optional[float] = None) -> Any:
+        try:
+            return flight.future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            self._give_up(flight)
+            raise LLMUnavailable("LLM call exceeded its deadline")
+
+    async def chat_async(self, prompt: str, kind: str, priority: int = PRIORITY_HEALTH,
+                         timeout: Optional[float] = None) -> Any:
+        """chat() for coroutines; the call itself still runs on a worker thread."""
+        flight = self.submit(prompt, kind, priority, timeout)
+        try:
+            # Shielded so one caller giving up does not cancel the shared call
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(flight.future)),
+                self.timeout if timeout is None else timeout
+            )
+        except asyncio.TimeoutError:
+            self._give_up(flight)
+            raise LLMUnavailable("LLM call exceeded its deadline")
+
+    def _give_up(self, flight: _Flight) -> None:
+        # Coalesced callers keep the call alive until the last one gives up or its deadline passes
+        with self._ready:
+            flight.waiters -= 1
+            if flight.waiters > 0 and time.monotonic() < flight.deadline:
+                return
+        self._fail(flight, "deadline")
+
+    def _fail(self, flight: _Flight, error: Optional[str]) -> None:
+        with self._ready:
+            if flight.failed:
+                return
+            flight.failed = True
+            # Later callers with the same prompt start a fresh call
+            if self._in_flight.get(flight.key) is flight:
+                del self._in_flight[flight.key]
+        if error:
+            LLM_ERRORS.inc(kind=flight.kind, error=error)
+        self.breaker.record_failure()
+
+    def _run(self) -> None:
+        while True:
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+                _, _, flight = heapq.heappop(self._queue)
+            if time.monotonic() >= flight.deadline or flight.failed:
+                # Every caller has given up; don't spend model time on it
+                self._fail(flight, "deadline")
+                flight.future.set_exception(LLMUnavailable("LLM call expired in the queue"))
+                continue
+            flight.started = time.monotonic()
+            flight.context.run(self._execute, flight)
+
+    def _execute(self, flight: _Flight) -> None:
+        try:
+            with llm_call(flight.kind) as call:
+                if flight.chunks is None:
+                    response = self.call(flight.prompt)
+                else:
+                    response = None
+                    for response in self.stream_call(flight.prompt):
+                        if flight.failed:
+                            break
+                        flight.chunks.put(response)
+                # Token counts arrive on the final chunk of a stream
+                call.record(response)
+        except Exception as e:
+            # llm_call has already counted the error
+            self._fail(flight, None)
+            flight.future.set_exception(e)
+            if flight.chunks is not None:
+                flight.chunks.put(e)
+        else:
+            if not flight.failed:
+                self.breaker.record_success()
+            flight.future.set_result(response)
+            if flight.chunks is not None:
+                flight.chunks.put(_END)
+        finally:
+            with self._ready:
+                if self._in_flight.get(flight.key) is flight:
+                    del self._in_flight[flight.key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._ready:
+            queued, in_flight = len(self._queue), len(self._in_flight)
+        return {
+            "queued": queued,
+            "in_flight": in_flight,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips
+        }
+
+    def register_metrics(self) -> None:
+        REGISTRY.add_collector("llm_queue_depth", "gauge", "LLM calls waiting for a worker.",
+                               lambda: [({}, self.stats()["queued"])])
+        REGISTRY.add_collector("llm_coalesced_total", "counter", "Calls answered by an identical in-flight call.",
+                               lambda: [({}, self.coalesced)])
+        REGISTRY.add_collector("llm_circuit_open", "gauge", "1 while the LLM circuit breaker is open.",
+                               lambda: [({}, int(self.breaker.state == CircuitBreaker.OPEN))])
@@ -0,0 +1,237 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans fast in-memory stages through slow LLM generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (labels, value) samples reported by a collector at scrape time
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() is a bisect and three additions under a lock."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in series:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+        self.collectors: List[Tuple[str, str, str, Callable[[], Samples]]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, name: str, metric_type: str, help_text: str, collect: Callable[[], Samples]) -> None:
+        """Report values owned elsewhere (cache stats, queue sizes) when scraped."""
+        self.collectors.append((name, metric_type, help_text, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for name, metric_type, help_text, collect in self.collectors:
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"])
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "query_stage_seconds", "Time spent in each stage of the query pipeline (stages may nest).", ["stage"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_seconds", "Time to produce a response, excluding streamed bodies.", ["endpoint", "status"]
+)
+LLM_SECONDS = REGISTRY.histogram("llm_call_seconds", "Duration of LLM calls.", ["kind"])
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens processed by LLM calls.", ["kind", "type"])
+LLM_ERRORS = REGISTRY.counter("llm_errors_total", "Failed LLM calls by cause.", ["kind", "error"])
+
+
+class Trace:
+    """Stage timings of one request, for the Server-Timing debug header."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.append((name, seconds))
+
+    def server_timing(self) -> str:
+        with self._lock:
+            stages = list(self.stages)
+        totals: Dict[str, Tuple[float, int]] = {}
+        for name, seconds in stages:
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + seconds, count + 1)
+        entries = [
+            f'{name};dur={total * 1000:.2f}' + (f';desc="x{count}"' if count > 1 else "")
+            for name, (total, count) in totals.items()
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def start_trace() -> Trace:
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace() -> Optional[Trace]:
+    trace = _current_trace.get()
+    _current_trace.set(None)
+    return trace
+
+
+def _record_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable:
+    """Decorator recording each call of a (non-generator) function as a stage."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _field(response, name: str) -> int:
+    try:
+        return int(response[name] or 0)
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+
+class LLMCall:
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    def record(self, response) -> None:
+        """Count tokens from an Ollama response (or the final chunk of a stream)."""
+        LLM_TOKENS.inc(_field(response, "prompt_eval_count"), kind=self.kind, type="prompt")
+        LLM_TOKENS.inc(_field(response, "eval_count"), kind=self.kind, type="completion")
+
+
+@contextmanager
+def llm_call(kind: str) -> Iterator[LLMCall]:
+    """Time an LLM call and count its errors; exceptions propagate unchanged."""
+    call = LLMCall(kind)
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        LLM_ERRORS.inc(kind=kind, error="timeout" if "timeout" in type(e).__name__.lower() else "error")
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        LLM_SECONDS.observe(seconds, kind=kind)
+        _record_stage(f"llm_{kind}", seconds)
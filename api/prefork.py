@@ -0,0 +1,133 @@
+"""Pre-fork server for model_api: load and index the data once, then fork workers.
+
+The master imports model_api, which loads the data files, builds the indexes and
+seeds the metric store, then freezes the garbage collector so the workers'
+collections never write to the shared objects' pages. Each forked worker
+inherits that state copy-on-write and serves the same listening socket. Sessions
+and the LLM caches move to SQLite files so every worker sees the same state.
+
+Posted metric samples go through a shared SQLite log that each worker's
+metric store catches up from before it evaluates.
+
+Each worker polls the data files itself. Only the worker in slot 0 appends
+reloaded incidents to the similarity index; the others remap it before
+searching. Each worker keeps its own LLM scheduler and /metrics counters.
+
+Run from the api directory:
+    python prefork.py --workers 4 --port 5000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+from werkzeug.serving import make_server
+
+import model_api
+
+
+def listen(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def prepare_master() -> None:
+    # Only the main thread may be running at fork time
+    model_api.metric_seed.join()
+    model_api.data_watcher.stop()
+    gc.collect()
+    gc.freeze()
+
+
+def serve_worker(sock: socket.socket, host: str, port: int, slot: int) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Opened after the fork: SQLite connections must not cross processes
+    model_api.use_shared_state(index_writer=slot == 0)
+    if model_api.CONFIG["data_reload_interval"]:
+        model_api.data_watcher.start()
+    server = make_server(host, port, model_api.app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def spawn(sock: socket.socket, host: str, port: int, slot: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            serve_worker(sock, host, port, slot)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def supervise(sock: socket.socket, host: str, port: int, workers: int) -> None:
+    # pid -> (slot, start time); a restarted worker takes over its predecessor's slot
+    children: Dict[int, Tuple[int, float]] = {}
+    stopping = False
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for slot in range(workers):
+        children[spawn(sock, host, port, slot)] = (slot, time.monotonic())
+    print(f"prefork: {workers} workers on {host}:{port} (master {os.getpid()})", file=sys.stderr)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        child = children.pop(pid, None)
+        if stopping or child is None:
+            continue
+        slot, started = child
+        print(f"prefork: worker {pid} exited with status {status}; restarting", file=sys.stderr)
+        # A worker that dies straight after starting would otherwise be restarted in a tight loop
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)
+        children[spawn(sock, host, port, slot)] = (slot, time.monotonic())
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve model_api from pre-forked worker processes")
+    parser.add_argument("--workers", type=int, default=model_api.CONFIG["workers"],
+                        help="worker processes; 0 means one per CPU core")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+    sock = listen(args.host, args.port)
+    prepare_master()
+    supervise(sock, args.host, args.port, workers)
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Compact per-session record: (last_incident_id, last_ci, last_seen)
+SessionRecord = Tuple[Optional[str], Optional[str], float]
+
+DEFAULT_SESSION_ID = "default"
+
+
+class MemorySessionBackend:
+    """In-process sessions with LRU eviction, idle expiry and a session cap."""
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record is None:
+                return None
+            if record[2] + self.ttl < time.time():
+                del self._sessions[session_id]
+                self.expirations += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            return record
+
+    def put(self, session_id: str, record: SessionRecord) -> None:
+        with self._lock:
+            self._sessions[session_id] = record
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class SQLiteSessionBackend:
+    """Sessions in a local SQLite file so several worker processes can share them."""
+
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, path: str, max_sessions: int = 10000, ttl: float = 1800.0):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_prune = 0.0
+        self.evictions = 0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, last_incident_id TEXT, last_ci TEXT, last_seen REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        row = self._connection().execute(
+            "SELECT last_incident_id, last_ci, last_seen FROM sessions WHERE session_id = ? AND last_seen >= ?",
+            (session_id, time.time() - self.ttl)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def put(self, session_id: str, record: SessionRecord) -> None:
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO sessions (session_id, last_incident_id, last_ci, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_incident_id = excluded.last_incident_id, "
+                "last_ci = excluded.last_ci, last_seen = excluded.last_seen",
+                (session_id, *record)
+            )
+        if record[2] - self._last_prune > self.PRUNE_INTERVAL:
+            self._prune(record[2])
+
+    def _prune(self, now: float) -> None:
+        self._last_prune = now
+        with self._connection() as connection:
+            connection.execute("DELETE FROM sessions WHERE last_seen < ?", (now - self.ttl,))
+            cursor = connection.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            )
+            self.evictions += cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return {"sessions": count, "max_sessions": self.max_sessions, "evictions": self.evictions}
+
+
+class SessionStore:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def load(self, session_id: str) -> Dict:
+        record = self.backend.get(session_id)
+        if record is None:
+            return {"last_incident_id": None, "last_ci": None}
+        return {"last_incident_id": record[0], "last_ci": record[1]}
+
+    def save(self, session_id: str, context: Dict) -> None:
+        self.backend.put(session_id, (context.get("last_incident_id"), context.get("last_ci"), time.time()))
+
+    def stats(self) -> Dict[str, int]:
+        return self.backend.stats()
+
+
+def create_session_store(config: Dict) -> SessionStore:
+    if config.get("session_backend") == "sqlite":
+        backend = SQLiteSessionBackend(config["session_db_file"], config["session_max"], config["session_ttl"])
+    else:
+        backend = MemorySessionBackend(config["session_max"], config["session_ttl"])
+    return SessionStore(backend)
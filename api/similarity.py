@@ -0,0 +1,370 @@
+import fcntl
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+TEXT_FIELDS = ("short_description", "description", "resolution_notes")
+RESOLVED_STATUSES = ("resolved", "closed")
+
+# Per-row state stored in rows.u8
+OPEN_ROW, RESOLVED_ROW, RETIRED_ROW = 0, 1, 2
+
+# From this many rows on, search scans only the PROBES partitions nearest the query
+PARTITION_MIN_ROWS = 50_000
+PARTITIONS = 1024
+PROBES = 32
+TRAINING_ROUNDS = 8
+TRAINING_SAMPLE = 64 * PARTITIONS
+ASSIGN_CHUNK = 1 << 16
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were with".split()
+)
+
+
+def incident_text(incident) -> str:
+    return " ".join(incident.get(field) or "" for field in TEXT_FIELDS)
+
+
+def tokenize(text: str) -> List[str]:
+    words = [word for word in _TOKEN.findall(text.lower()) if word not in _STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+class IncidentSimilarityIndex:
+    """Top-k cosine search over hashed TF-IDF embeddings of incident text.
+
+    Unigrams and bigrams are hashed into ``buckets`` document-frequency
+    counters for IDF weighting, then folded with a random sign into ``dim``
+    float32 columns. Rows are L2-normalised, so a matrix-vector product gives
+    cosine similarity for every incident at once.
+
+    On disk the index is append-only: ``vectors.f32`` (rows), ``rows.u8``
+    (open/resolved/retired state), ``offsets.i64`` plus ``records.jsonl``
+    (row metadata), ``df.npy`` and ``index.json``. Re-indexing an incident
+    retires its old row in place. Loading memory-maps the arrays, so start-up
+    does not depend on the number of incidents. IDF weights keep evolving as
+    incidents are added; rows already written are not re-weighted.
+
+    Once the index reaches PARTITION_MIN_ROWS rows, spherical k-means over a
+    sample of them gives PARTITIONS centroids (``centroids.f32``) and every
+    row, then each row added later, is filed under its nearest centroid
+    (``partitions.u16``). Search then scores only the rows of the PROBES
+    partitions nearest the query, about 3% of the index, so a match filed
+    under a partition outside those is missed.
+
+    Several processes may share one directory as long as only one of them
+    writes: writes hold an exclusive lock on ``index.lock``, and the readers
+    ``refresh()`` under a shared lock to map the rows written since.
+    """
+
+    def __init__(self, directory: str, dim: int = 96, buckets: int = 1 << 18):
+        self.directory = directory
+        self.dim = dim
+        self.buckets = buckets
+        self.df = np.zeros(buckets, dtype=np.int32)
+        self.num_docs = 0
+        self.num_rows = 0
+        self.sources: Dict[str, List[int]] = {}
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._states = np.zeros(0, dtype=np.uint8)
+        self._offsets = np.zeros(0, dtype=np.int64)
+        self.num_partitions = 0
+        self.probes = PROBES
+        self._centroids = np.zeros((0, dim), dtype=np.float32)
+        self._partitions = np.zeros(0, dtype=np.uint16)
+        # (partitions, rows ordered by partition, start of each partition in that order)
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._row_by_id: Optional[Dict[str, int]] = None
+        self._token_cache: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path("index.lock"), 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _header_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._path("index.json"))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _hash(self, token: str) -> tuple:
+        cached = self._token_cache.get(token)
+        if cached is None:
+            value = zlib.crc32(token.encode("utf-8"))
+            cached = (value % self.buckets, (value >> 7) % self.dim, 1.0 if value & (1 << 31) else -1.0)
+            if len(self._token_cache) < 1_000_000:
+                self._token_cache[token] = cached
+        return cached
+
+    def _count_document(self, tokens: Sequence[str]) -> None:
+        for bucket in {self._hash(token)[0] for token in tokens}:
+            self.df[bucket] += 1
+        self.num_docs += 1
+
+    def embed(self, text: str) -> np.ndarray:
+        counts: Dict[str, int] = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        return self._embed_counts(counts)
+
+    def _embed_counts(self, counts: Dict[str, int]) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token, count in counts.items():
+            bucket, column, sign = self._hash(token)
+            idf = math.log((1 + self.num_docs) / (1 + self.df[bucket])) + 1.0
+            vector[column] += sign * (1.0 + math.log(count)) * idf
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _record(incident) -> Dict:
+        return {
+            "id": incident.get("id"),
+            "short_description": incident.get("short_description", ""),
+            "affected_ci": incident.get("affected_ci"),
+            "status": incident.get("status", ""),
+            "resolution_notes": incident.get("resolution_notes") or ""
+        }
+
+    def build(self, incidents: Iterable, sources: Optional[Dict[str, List[int]]] = None) -> None:
+        """Create the index from scratch: one pass for IDF, one to embed."""
+        documents = []
+        for incident in incidents:
+            counts: Dict[str, int] = {}
+            for token in tokenize(incident_text(incident)):
+                counts[token] = counts.get(token, 0) + 1
+            documents.append((self._record(incident), counts))
+            self._count_document(list(counts))
+        vectors = np.stack([self._embed_counts(counts) for _, counts in documents]) if documents else None
+        with self._file_lock(exclusive=True):
+            for name in ("vectors.f32", "rows.u8", "offsets.i64", "records.jsonl", "partitions.u16"):
+                open(self._path(name), 'wb').close()
+            self.num_rows = 0
+            self.num_partitions = 0
+            self.sources = sources or {}
+            self._row_by_id = None
+            self._append(vectors, [record for record, _ in documents])
+
+    def _append(self, vectors: Optional[np.ndarray], records: List[Dict]) -> None:
+        if records:
+            with open(self._path("records.jsonl"), 'ab') as file:
+                offset = file.tell()
+                offsets = []
+                for record in records:
+                    line = (json.dumps(record) + "\n").encode("utf-8")
+                    offsets.append(offset)
+                    offset += len(line)
+                    file.write(line)
+            with open(self._path("offsets.i64"), 'ab') as file:
+                file.write(np.asarray(offsets, dtype=np.int64).tobytes())
+            with open(self._path("vectors.f32"), 'ab') as file:
+                file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            states = [RESOLVED_ROW if str(record["status"]).lower() in RESOLVED_STATUSES else OPEN_ROW for record in records]
+            with open(self._path("rows.u8"), 'ab') as file:
+                file.write(np.asarray(states, dtype=np.uint8).tobytes())
+            if self.num_partitions:
+                with open(self._path("partitions.u16"), 'ab') as file:
+                    file.write(self._assign(np.asarray(vectors, dtype=np.float32)).tobytes())
+            if self._row_by_id is not None:
+                for row, record in enumerate(records, start=self.num_rows):
+                    self._row_by_id[str(record["id"]).lower()] = row
+            self.num_rows += len(records)
+            if not self.num_partitions and self.num_rows >= PARTITION_MIN_ROWS:
+                self._train_partitions()
+        np.save(self._path("df.npy"), self.df)
+        with open(self._path("index.json"), 'w') as file:
+            json.dump({
+                "dim": self.dim,
+                "buckets": self.buckets,
+                "num_docs": self.num_docs,
+                "num_rows": self.num_rows,
+                "partitions": self.num_partitions,
+                "sources": self.sources
+            }, file)
+        self._signature = self._header_signature()
+        self._map()
+
+    def _map(self) -> None:
+        if self.num_rows:
+            self._vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode='r', shape=(self.num_rows, self.dim))
+            self._states = np.memmap(self._path("rows.u8"), dtype=np.uint8, mode='r', shape=(self.num_rows,))
+            self._offsets = np.memmap(self._path("offsets.i64"), dtype=np.int64, mode='r', shape=(self.num_rows,))
+        if self.num_partitions:
+            self._centroids = np.fromfile(self._path("centroids.f32"), dtype=np.float32).reshape(-1, self.dim)
+            self._partitions = np.memmap(self._path("partitions.u16"), dtype=np.uint16, mode='r', shape=(self.num_rows,))
+
+    def _train_partitions(self) -> None:
+        """Spherical k-means over a sample of the rows, then file every row under its nearest centroid."""
+        vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode='r', shape=(self.num_rows, self.dim))
+        rng = np.random.default_rng(0)
+        sample = np.asarray(vectors[np.sort(rng.choice(self.num_rows, min(self.num_rows, TRAINING_SAMPLE), replace=False))])
+        sample = sample[np.linalg.norm(sample, axis=1) > 0]
+        centroids = sample[rng.choice(len(sample), PARTITIONS, replace=False)]
+        for _ in range(TRAINING_ROUNDS):
+            nearest = (sample @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # A centroid that lost all its rows keeps its place
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids).astype(np.float32)
+        self._centroids = centroids
+        with open(self._path("centroids.f32"), 'wb') as file:
+            file.write(centroids.tobytes())
+        with open(self._path("partitions.u16"), 'wb') as file:
+            for start in range(0, self.num_rows, ASSIGN_CHUNK):
+                file.write(self._assign(np.asarray(vectors[start:start + ASSIGN_CHUNK])).tobytes())
+        self.num_partitions = len(centroids)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return (vectors @ self._centroids.T).argmax(axis=1).astype(np.uint16)
+
+    def _probe(self, query: np.ndarray) -> np.ndarray:
+        """Rows filed under the ``probes`` partitions nearest ``query``, in row order."""
+        lists = self._lists
+        if lists is None or lists[0] is not self._partitions:
+            partitions = self._partitions
+            order = np.argsort(partitions, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(np.bincount(partitions, minlength=len(self._centroids)))))
+            self._lists = lists = (partitions, order, starts)
+        _, order, starts = lists
+        probes = min(self.probes, len(starts) - 1)
+        nearest = np.argpartition(-(self._centroids @ query), probes - 1)[:probes]
+        rows = np.concatenate([order[starts[partition]:starts[partition + 1]] for partition in nearest])
+        rows.sort()
+        return rows
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["IncidentSimilarityIndex"]:
+        if not os.path.exists(os.path.join(directory, "index.json")):
+            return None
+        index = cls(directory)
+        return index if index._load() else None
+
+    def _load(self) -> bool:
+        with self._file_lock(exclusive=False):
+            try:
+                with open(self._path("index.json"), 'r') as file:
+                    header = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return False
+            self.dim, self.buckets = header["dim"], header["buckets"]
+            self.num_docs = header["num_docs"]
+            self.num_rows = header["num_rows"]
+            self.num_partitions = header.get("partitions", 0)
+            self.sources = header.get("sources", {})
+            self.df = np.load(self._path("df.npy"))
+            self._row_by_id = None
+            self._token_cache.clear()
+            self._signature = self._header_signature()
+            self._map()
+        return True
+
+    def refresh(self) -> bool:
+        """Map rows another process has written since; True if anything changed."""
+        if self._header_signature() == self._signature:
+            return False
+        with self._lock:
+            return self._header_signature() != self._signature and self._load()
+
+    def record(self, row: int) -> Dict:
+        with open(self._path("records.jsonl"), 'rb') as file:
+            file.seek(int(self._offsets[row]))
+            return json.loads(file.readline())
+
+    def _rows_by_id(self) -> Dict[str, int]:
+        if self._row_by_id is None:
+            rows: Dict[str, int] = {}
+            with open(self._path("records.jsonl"), 'rb') as file:
+                for row, line in enumerate(file):
+                    if row >= self.num_rows:
+                        break
+                    rows[str(json.loads(line)["id"]).lower()] = row
+            self._row_by_id = rows
+        return self._row_by_id
+
+    def add(self, incidents: Iterable) -> int:
+        """Index new incidents, or re-index ones whose text or status changed."""
+        with self._lock, self._file_lock(exclusive=True):
+            rows = self._rows_by_id()
+            records, vectors = [], []
+            for incident in incidents:
+                record = self._record(incident)
+                row = rows.get(str(record["id"]).lower())
+                if row is not None:
+                    if self.record(row) == record:
+                        continue
+                    self._retire(row)
+                text = incident_text(incident)
+                self._count_document(set(tokenize(text)))
+                records.append(record)
+                vectors.append(self.embed(text))
+            if records:
+                self._append(np.stack(vectors), records)
+            return len(records)
+
+    def _retire(self, row: int) -> None:
+        with open(self._path("rows.u8"), 'r+b') as file:
+            file.seek(row)
+            file.write(bytes([RETIRED_ROW]))
+
+    def search(self, text: str, k: int = 5, resolved_only: bool = True,
+               exclude_id: Optional[str] = None) -> List[Dict]:
+        if not self.num_rows:
+            return []
+        # A concurrent refresh may have mapped more states than these vectors
+        vectors = self._vectors
+        states = self._states[:len(vectors)]
+        query = self.embed(text)
+        rows = None
+        if self.num_partitions:
+            rows = self._probe(query)
+            rows = rows[rows < len(vectors)]
+            vectors, states = vectors[rows], states[rows]
+        scores = vectors @ query
+        keep = states == RESOLVED_ROW if resolved_only else states != RETIRED_ROW
+        scores = np.where(keep, scores, -np.inf)
+        if not len(scores):
+            return []
+        # Over-fetch by one in case the query incident is among the matches
+        fetch = min(len(scores), k + 1)
+        candidates = np.argpartition(-scores, fetch - 1)[:fetch]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        results, seen = [], set()
+        if exclude_id:
+            seen.add(exclude_id.lower())
+        for candidate in candidates:
+            if not np.isfinite(scores[candidate]) or scores[candidate] <= 0:
+                break
+            row = candidate if rows is None else rows[candidate]
+            record = self.record(int(row))
+            key = str(record["id"]).lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            record["similarity"] = round(float(scores[candidate]), 4)
+            results.append(record)
+            if len(results) == k:
+                break
+        return results
+
@@ -0,0 +1,482 @@
+"""Compiled, memory-mapped snapshot of the data files.
+
+A snapshot holds a string table, the compact incident and observability
+records, the dashboard and CMDB entries, every DataStore index and the CMDB
+adjacency in CSR form. Processes open it with ``mmap`` and decode records on
+lookup, so start-up does not depend on the data size and every worker shares
+the same page-cache copy.
+
+Layout: a fixed header (magic, format version, table-of-contents length and
+the SHA-256 of everything after the header), a JSON table of contents, then
+8-byte aligned sections.
+
+Build and verify from the api directory:
+    python snapshot.py build [-o data.snapshot]
+    python snapshot.py verify data.snapshot
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping as MappingABC, Sequence as SequenceABC
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from ci_recogniser import CIRecogniser
+from cmdb_graph import CMDBGraph, DOWNSTREAM, UPSTREAM
+from data_store import DataStore
+from data_watcher import load_json_file
+from ingest import IncidentRecord, ObservabilityRecord, load_records, source_signature
+from open_incident_view import OpenIncidentView
+
+MAGIC = b"BFSNAP\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sII32s")
+ALIGNMENT = 8
+
+# Encoded values: id >= 0 is a plain string, NONE is None, below that JSON text
+NONE = -1
+
+# DataStore attributes decoded in full only when something needs them
+MATERIALISED = (
+    "servicenow_data", "dashboards", "observability_data", "cmdb_data",
+    "incidents_by_id", "incidents_by_status", "incidents_by_ci", "open_incident_list",
+    "observability_by_ci", "cmdb_by_ci"
+)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _LazySequence(SequenceABC):
+    """Read-only sequence that decodes items from the snapshot on access."""
+
+    def __init__(self, length: int, item: Callable[[int], Any]):
+        self._length = length
+        self._item = item
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._item(i) for i in range(*index.indices(self._length))]
+        if not -self._length <= index < self._length:
+            raise IndexError(index)
+        return self._item(index % self._length)
+
+
+class _LazyMapping(MappingABC):
+    """Read-only mapping over one of the snapshot's sorted key indexes."""
+
+    def __init__(self, store: "SnapshotStore", name: str):
+        self._store = store
+        self._name = name
+
+    def __getitem__(self, key: str) -> int:
+        row = self._store._lookup(self._name, key)
+        if row is None:
+            raise KeyError(key)
+        return row
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._store._string(sid) for sid in self._store._sections[f"{self._name}.keys"])
+
+    def __len__(self) -> int:
+        return len(self._store._sections[f"{self._name}.keys"])
+
+
+class _Writer:
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+        self.sections: Dict[str, bytes] = {}
+        self.typecodes: Dict[str, str] = {}
+
+    def string(self, value: str) -> int:
+        sid = self.strings.get(value)
+        if sid is None:
+            sid = self.strings[value] = len(self.strings)
+        return sid
+
+    def value(self, value: Any) -> int:
+        if value is None:
+            return NONE
+        if isinstance(value, str):
+            return self.string(value)
+        return NONE - 1 - self.string(json.dumps(value))
+
+    def add(self, name: str, values: array) -> None:
+        self.sections[name] = values.tobytes()
+        self.typecodes[name] = values.typecode
+
+    def records(self, name: str, records: Sequence, fields: Sequence[str]) -> None:
+        self.add(name, array('i', [self.value(record.get(field)) for record in records for field in fields]))
+
+    def key_index(self, name: str, rows: Dict[str, int]) -> None:
+        keys = sorted(rows)
+        self.add(f"{name}.keys", array('i', [self.string(key) for key in keys]))
+        self.add(f"{name}.rows", array('i', [rows[key] for key in keys]))
+
+    def group_index(self, name: str, groups: Dict[str, List[int]]) -> None:
+        keys = sorted(groups)
+        indptr, members = [0], []
+        for key in keys:
+            members.extend(groups[key])
+            indptr.append(len(members))
+        self.add(f"{name}.keys", array('i', [self.string(key) for key in keys]))
+        self.add(f"{name}.indptr", array('i', indptr))
+        self.add(f"{name}.rows", array('i', members))
+
+    def csr(self, name: str, neighbours: Sequence[Sequence[int]]) -> None:
+        indptr, indices = [0], array('i')
+        for members in neighbours:
+            indices.extend(members)
+            indptr.append(len(indices))
+        self.add(f"{name}.indptr", array('i', indptr))
+        self.add(f"{name}.indices", indices)
+
+    def finish(self, path: str, toc: Dict) -> None:
+        encoded = [value.encode("utf-8") for value in self.strings]
+        offsets = array('q', [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        self.add("strings.offsets", offsets)
+        self.sections["strings.data"] = b"".join(encoded)
+        self.typecodes["strings.data"] = 'B'
+
+        # Section offsets depend on the table of contents' length; lay out until stable
+        toc["sections"] = {name: [0, len(data), self.typecodes[name]] for name, data in self.sections.items()}
+        start = -1
+        toc_bytes = json.dumps(toc).encode("utf-8")
+        while _align(HEADER.size + len(toc_bytes)) != start:
+            start = position = _align(HEADER.size + len(toc_bytes))
+            for name, data in self.sections.items():
+                toc["sections"][name][0] = position
+                position = _align(position + len(data))
+            toc_bytes = json.dumps(toc).encode("utf-8")
+
+        body = bytearray(toc_bytes)
+        for name, data in self.sections.items():
+            body.extend(b"\x00" * (toc["sections"][name][0] - HEADER.size - len(body)))
+            body.extend(data)
+        digest = hashlib.sha256(body).digest()
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(toc_bytes), digest))
+            file.write(body)
+
+
+def _align(position: int) -> int:
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_snapshot(store: DataStore, path: str, sources: Optional[Dict[str, List[int]]] = None) -> None:
+    """Compile ``store`` into a snapshot file at ``path``."""
+    writer = _Writer()
+    incident_rows = {id(incident): row for row, incident in enumerate(store.servicenow_data)}
+    observability_rows = {id(entry): row for row, entry in enumerate(store.observability_data)}
+    cmdb_rows = {id(entry): row for row, entry in enumerate(store.cmdb_data)}
+
+    writer.records("incidents", store.servicenow_data, IncidentRecord.FIELDS)
+    writer.records("observability", store.observability_data, ObservabilityRecord.FIELDS)
+    writer.add("cmdb", array('i', [writer.string(json.dumps(entry)) for entry in store.cmdb_data]))
+    dashboard_keys = list(store.dashboards)
+    writer.add("dashboards", array('i', [writer.value(store.dashboards[key]) for key in dashboard_keys]))
+
+    writer.key_index("incidents_by_id", {key: incident_rows[id(i)] for key, i in store.incidents_by_id.items()})
+    writer.key_index("observability_by_ci", {key: observability_rows[id(e)] for key, e in store.observability_by_ci.items()})
+    writer.key_index("cmdb_by_ci", {key: cmdb_rows[id(e)] for key, e in store.cmdb_by_ci.items()})
+    writer.key_index("dashboards_by_ci", {key: row for row, key in enumerate(dashboard_keys)})
+    for name in ("incidents_by_status", "incidents_by_ci"):
+        groups = getattr(store, name)
+        writer.group_index(name, {key: [incident_rows[id(i)] for i in members] for key, members in groups.items()})
+    writer.add("open_incidents", array('i', [incident_rows[id(i)] for i in store.open_incidents()]))
+
+    graph = store.graph
+    writer.add("graph.names", array('i', [writer.string(name) for name in graph.names]))
+    writer.key_index("graph.ids", graph.ids)
+    writer.csr("graph.upstream", graph.adjacency[UPSTREAM])
+    writer.csr("graph.downstream", graph.adjacency[DOWNSTREAM])
+
+    writer.finish(path, {
+        "counts": {
+            "incidents": len(store.servicenow_data),
+            "observability": len(store.observability_data),
+            "cmdb": len(store.cmdb_data),
+            "dashboards": len(dashboard_keys),
+            "ci_nodes": len(graph)
+        },
+        "sources": sources or {}
+    })
+
+
+class SnapshotStore(DataStore):
+    """DataStore backed by a memory-mapped snapshot.
+
+    Lookups binary-search the prebuilt indexes and decode only the records
+    they return. The plain DataStore attributes (``servicenow_data``,
+    ``incidents_by_id``, ...) are decoded on first access, which the
+    ``with_*`` methods need when a data file is reloaded.
+    """
+
+    def __init__(self, path: str, verify: bool = False):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            raise SnapshotError(f"{path}: truncated header")
+        magic, version, toc_length, digest = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path}: not a snapshot file")
+        if version != VERSION:
+            raise SnapshotError(f"{path}: format version {version}, expected {VERSION}")
+        if verify and hashlib.sha256(self._mmap[HEADER.size:]).digest() != digest:
+            raise SnapshotError(f"{path}: checksum mismatch")
+        self.toc = json.loads(self._mmap[HEADER.size:HEADER.size + toc_length])
+        view = memoryview(self._mmap)
+        try:
+            self._sections = {
+                name: view[offset:offset + length].cast(typecode)
+                for name, (offset, length, typecode) in self.toc["sections"].items()
+            }
+        except (TypeError, ValueError) as error:
+            raise SnapshotError(f"{path}: corrupt section table: {error}")
+        self.counts = self.toc["counts"]
+        self._lock = threading.Lock()
+        self._open: Optional[List] = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not yet in __dict__
+        if name == "graph":
+            self.graph = self._load_graph()
+            return self.graph
+        if name == "open_view":
+            # Joins through the snapshot lookups; no index needs materialising
+            self.open_view = OpenIncidentView.build(self.open_incidents(), self)
+            return self.open_view
+        if name == "ci_recogniser":
+            self.ci_recogniser = CIRecogniser(self.ci_names())
+            return self.ci_recogniser
+        if name in MATERIALISED:
+            self._materialise()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def _string(self, sid: int) -> str:
+        offsets = self._sections["strings.offsets"]
+        return str(self._sections["strings.data"][offsets[sid]:offsets[sid + 1]], "utf-8")
+
+    def _value(self, sid: int) -> Any:
+        if sid >= 0:
+            return self._string(sid)
+        if sid == NONE:
+            return None
+        return json.loads(self._string(NONE - 1 - sid))
+
+    def _incident(self, row: int) -> IncidentRecord:
+        width = len(IncidentRecord.FIELDS)
+        values = self._sections["incidents"][row * width:(row + 1) * width]
+        return IncidentRecord(dict(zip(IncidentRecord.FIELDS, map(self._value, values))))
+
+    def _observability(self, row: int) -> ObservabilityRecord:
+        width = len(ObservabilityRecord.FIELDS)
+        values = self._sections["observability"][row * width:(row + 1) * width]
+        return ObservabilityRecord(dict(zip(ObservabilityRecord.FIELDS, map(self._value, values))))
+
+    def _cmdb_entry(self, row: int) -> Dict:
+        return json.loads(self._string(self._sections["cmdb"][row]))
+
+    def _find(self, name: str, key: str) -> Optional[int]:
+        keys = self._sections[f"{name}.keys"]
+        position = bisect_left(keys, key, key=self._string)
+        if position < len(keys) and self._string(keys[position]) == key:
+            return position
+        return None
+
+    def _lookup(self, name: str, key: str) -> Optional[int]:
+        position = self._find(name, key)
+        return None if position is None else self._sections[f"{name}.rows"][position]
+
+    def _group(self, name: str, key: str) -> List[IncidentRecord]:
+        position = self._find(name, key)
+        if position is None:
+            return []
+        indptr = self._sections[f"{name}.indptr"]
+        rows = self._sections[f"{name}.rows"][indptr[position]:indptr[position + 1]]
+        return [self._incident(row) for row in rows]
+
+    def _load_graph(self) -> CMDBGraph:
+        # Node names, ids and neighbour lists stay in the mapping until a node is visited
+        names = self._sections["graph.names"]
+        adjacency = {}
+        for direction in (UPSTREAM, DOWNSTREAM):
+            indptr = self._sections[f"graph.{direction}.indptr"]
+            indices = self._sections[f"graph.{direction}.indices"]
+            adjacency[direction] = _LazySequence(
+                len(names), lambda node, indptr=indptr, indices=indices: indices[indptr[node]:indptr[node + 1]]
+            )
+        return CMDBGraph.from_adjacency(
+            _LazySequence(len(names), lambda node: self._string(names[node])),
+            _LazyMapping(self, "graph.ids"),
+            adjacency[UPSTREAM],
+            adjacency[DOWNSTREAM]
+        )
+
+    def _materialise(self) -> None:
+        with self._lock:
+            if all(name in self.__dict__ for name in MATERIALISED):
+                return
+            # Build aside and publish whole attributes so readers never see a partial index
+            built = object.__new__(DataStore)
+            sections = self._sections
+            built.servicenow_data = [self._incident(row) for row in range(self.counts["incidents"])]
+            built.observability_data = [self._observability(row) for row in range(self.counts["observability"])]
+            built.cmdb_data = [self._cmdb_entry(row) for row in range(self.counts["cmdb"])]
+            built.dashboards = {
+                self._string(key): self._value(sections["dashboards"][row])
+                for key, row in zip(sections["dashboards_by_ci.keys"], sections["dashboards_by_ci.rows"])
+            }
+            built._build_indexes()
+            for name in MATERIALISED:
+                self.__dict__[name] = built.__dict__[name]
+
+    def _derive(self, **attributes) -> DataStore:
+        self._materialise()
+        self.graph  # noqa: B018 - load it so the derived store carries it
+        self.open_view  # noqa: B018
+        self.ci_recogniser  # noqa: B018
+        return DataStore._derive(self, **attributes)
+
+    def is_complete(self) -> bool:
+        return all(self.counts[name] for name in ("incidents", "observability", "cmdb", "dashboards"))
+
+    def get_incident(self, incident_id: str) -> Optional[IncidentRecord]:
+        row = self._lookup("incidents_by_id", incident_id.lower())
+        return None if row is None else self._incident(row)
+
+    def get_observability(self, ci: str) -> Optional[ObservabilityRecord]:
+        row = self._lookup("observability_by_ci", ci.lower())
+        return None if row is None else self._observability(row)
+
+    def get_cmdb_entry(self, ci: str) -> Optional[Dict]:
+        row = self._lookup("cmdb_by_ci", ci.lower())
+        return None if row is None else self._cmdb_entry(row)
+
+    def get_dashboard_link(self, ci: str) -> str:
+        row = self._lookup("dashboards_by_ci", ci.lower())
+        return "No dashboard available" if row is None else self._value(self._sections["dashboards"][row])
+
+    def incidents_with_status(self, statuses) -> List[IncidentRecord]:
+        incidents = []
+        for status in statuses:
+            incidents.extend(self._group("incidents_by_status", status.lower()))
+        return incidents
+
+    def incidents_for_ci(self, ci: str) -> List[IncidentRecord]:
+        return self._group("incidents_by_ci", ci.lower())
+
+    def open_incidents(self) -> List[IncidentRecord]:
+        if self._open is None:
+            self._open = [self._incident(row) for row in self._sections["open_incidents"]]
+        return self._open
+
+    def observability_entries(self) -> Iterable[ObservabilityRecord]:
+        # Decoded one row at a time; observability_data would materialise every index
+        return (self._observability(row) for row in range(self.counts["observability"]))
+
+    def ci_names(self) -> Dict[str, str]:
+        # Records are decoded only for CIs the CMDB does not name
+        names = {name.lower(): name for name in self.graph.names}
+        for key in _LazyMapping(self, "observability_by_ci"):
+            if key not in names:
+                names[key] = self.get_observability(key)["ci"]
+        for key in _LazyMapping(self, "incidents_by_ci"):
+            if key not in names:
+                names[key] = self.incidents_for_ci(key)[0]["affected_ci"]
+        return names
+
+
+def open_snapshot(path: str, sources: Sequence[str]) -> Optional[SnapshotStore]:
+    """Open ``path`` unless it is missing, unreadable or older than a source file."""
+    try:
+        store = SnapshotStore(path)
+    except (OSError, SnapshotError):
+        return None
+    recorded = store.toc.get("sources", {})
+    if any(recorded.get(path) != signature for path, signature in source_signature(sources).items()):
+        return None
+    return store
+
+
+def build_from_files(servicenow_file: str, dashboards_file: str, observability_file: str,
+                     cmdb_file: str, output: str) -> DataStore:
+    store = DataStore(
+        load_records(servicenow_file, IncidentRecord),
+        load_json_file(dashboards_file),
+        load_records(observability_file, ObservabilityRecord),
+        load_json_file(cmdb_file)
+    )
+    sources = [servicenow_file, dashboards_file, observability_file, cmdb_file]
+    write_snapshot(store, output, source_signature(sources))
+    return store
+
+
+def verify_snapshot(path: str) -> Dict:
+    """Check the header and checksum, then that every index resolves to its record."""
+    store = SnapshotStore(path, verify=True)
+    for incident in store.servicenow_data:
+        if store.get_incident(incident["id"]) != store.incidents_by_id[incident["id"].lower()]:
+            raise SnapshotError(f"{path}: incident index mismatch for {incident['id']}")
+    for entry in store.observability_data:
+        if store.get_observability(entry["ci"]) != store.observability_by_ci[entry["ci"].lower()]:
+            raise SnapshotError(f"{path}: observability index mismatch for {entry['ci']}")
+    for key, members in store.incidents_by_status.items():
+        if store.incidents_with_status([key]) != members:
+            raise SnapshotError(f"{path}: status index mismatch for {key}")
+    for key, members in store.incidents_by_ci.items():
+        if store.incidents_for_ci(key) != members:
+            raise SnapshotError(f"{path}: CI index mismatch for {key}")
+    if store.open_incidents() != store.open_incident_list:
+        raise SnapshotError(f"{path}: open incident index mismatch")
+    graph = CMDBGraph.from_cmdb(store.cmdb_data)
+    if graph.names != list(store.graph.names) or any(
+        list(graph.adjacency[d][node]) != list(store.graph.adjacency[d][node])
+        for d in (UPSTREAM, DOWNSTREAM) for node in range(len(graph))
+    ):
+        raise SnapshotError(f"{path}: CMDB adjacency mismatch")
+    return {"version": VERSION, **store.counts, "sources": store.toc.get("sources", {})}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or verify a data snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile the JSON data files into a snapshot")
+    build.add_argument("-o", "--output", default="data.snapshot")
+    build.add_argument("--servicenow", default="servicenow_inc.json")
+    build.add_argument("--dashboards", default="dashboard_mapping.json")
+    build.add_argument("--observability", default="observability_data.json")
+    build.add_argument("--cmdb", default="cmdb_data.json")
+    verify = commands.add_parser("verify", help="check a snapshot's checksum and indexes")
+    verify.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        store = build_from_files(args.servicenow, args.dashboards, args.observability, args.cmdb, args.output)
+        print(f"Wrote {args.output}: {len(store.servicenow_data)} incidents, "
+              f"{len(store.observability_data)} observability entries, {len(store.graph)} CIs")
+        return 0
+    try:
+        summary = verify_snapshot(args.path)
+    except (OSError, SnapshotError) as error:
+        print(f"Invalid snapshot: {error}", file=sys.stderr)
+        return 1
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The api modules import each other flat and read their data files relative to api/
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+os.chdir(API_DIR)
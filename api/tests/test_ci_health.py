@@ -0,0 +1,30 @@
+import time
+
+from data_store import DataStore
+import model_api
+
+
+def test_reported_status_is_not_hidden_by_low_metrics():
+    store = DataStore(
+        [{"id": "INC0042", "status": "Open", "affected_ci": "APP-PROD-42", "description": "Outage"}],
+        {},
+        [{"ci": "APP-PROD-42", "status": "Critical", "cpu_usage": "10%", "memory_usage": "10%", "disk_usage": "10%"}],
+        []
+    )
+    now = time.time()
+    model_api.metric_store.add([("APP-PROD-42", metric, 10.0, now) for metric in ("cpu_usage", "memory_usage", "disk_usage")])
+
+    health = model_api.get_raw_health_status("APP-PROD-42", store)
+    assert health["status"] == "Critical"
+    assert health["message"] != "All metrics are within normal ranges and stable."
+
+    body, _ = model_api.open_incidents_page(store, {})
+    assert body["incidents"][0]["ci_health"] == "Critical"
+    assert model_api.health_evaluation(store).for_ci("APP-PROD-42")["metric_status"] == "Healthy"
+
+
+def test_prompt_has_measured_p95_and_cache_key_the_band():
+    health = {"status": "Critical", "metrics": {"cpu_usage": {"p95": 92.37, "state": "Critical", "trend": "steady"}}}
+    inputs = model_api.metric_prompt_inputs(health)
+    assert "p95 92.37%" in model_api.build_health_prompt(inputs)
+    assert model_api.health_cache_inputs(inputs)["cpu_usage"] == "Critical, p95 90%, steady"
@@ -0,0 +1,27 @@
+import json
+
+from data_store import DataStore
+from data_watcher import DataWatcher
+
+
+def test_failed_reload_is_retried_and_listener_errors_are_contained(tmp_path):
+    config = {}
+    for key in ("servicenow_file", "dashboards_file", "observability_file", "cmdb_file"):
+        config[key] = str(tmp_path / f"{key}.json")
+        (tmp_path / f"{key}.json").write_text("[]")
+    watcher = DataWatcher(config, DataStore([], {}, [], []))
+    (tmp_path / "observability_file.json").write_text(json.dumps([{"ci": "WEB-PROD-01", "status": "Healthy"}]))
+
+    # The first load of the changed file yields records without a CI, the next the file's own
+    loads = iter([[{"status": "Healthy"}]])
+    watcher.loaders["observability_file"] = lambda path: next(loads, None) or json.load(open(path))
+    seen = []
+    watcher.add_listener(lambda key, old, new, changed: 1 / 0)
+    watcher.add_listener(lambda key, old, new, changed: seen.append(changed))
+
+    watcher.poll()
+    assert watcher.store.get_observability("WEB-PROD-01") is None
+    watcher.poll()
+    assert watcher.store.get_observability("WEB-PROD-01")["status"] == "Healthy"
+    assert seen == [{"web-prod-01"}]
+    assert watcher.stats() == {"reloads": 1, "errors": 2}
@@ -0,0 +1,60 @@
+import pytest
+
+from data_store import DataStore
+import model_api
+
+
+@pytest.fixture
+def store():
+    return DataStore(
+        [{"id": "INC0001", "status": "Open", "affected_ci": "WEB-PROD-01", "description": "Slow pages"}],
+        {"web-prod-01": "https://grafana.example.com/web-prod-01"},
+        [{"ci": "WEB-PROD-01", "status": "Healthy", "cpu_usage": "20%", "memory_usage": "30%", "disk_usage": "40%"}],
+        [{"ci": "WEB-PROD-01", "upstream": [], "downstream": [{"ci": "DB-PROD-03"}]}]
+    )
+
+
+def test_known_ci_and_typo_resolve_to_canonical_name(store):
+    assert model_api.extract_ci_name("Check health of web-prod-01", store, {}) == "WEB-PROD-01"
+    assert model_api.extract_ci_name("Check health of WEB-PRD-01", store, {}) == "WEB-PROD-01"
+
+
+def test_plain_words_fall_back_to_last_ci(store):
+    assert model_api.extract_ci_name("Show dependencies for me", store, {"last_ci": "DB-PROD-03"}) == "DB-PROD-03"
+
+
+def test_unknown_ci_is_not_answered_for_last_ci(store):
+    context = {}
+    model_api.process_query("Check health of WEB-PROD-01", context, store, summarise=False)
+    assert context["last_ci"] == "WEB-PROD-01"
+
+    health = model_api.process_query("Check health of NEW-CI-99", context, store, summarise=False)
+    assert health["response"]["ci"] == "NEW-CI-99"
+    assert health["response"]["details"] == "No observability data available"
+
+    upstream = model_api.process_query("upstream for QUEUE-PROD-07", context, store, summarise=False)
+    assert upstream["response"]["ci"] == "QUEUE-PROD-07"
+    assert upstream["response"]["dependencies"] == {"upstream": [], "downstream": []}
+
+
+def test_unknown_incident_id_is_not_taken_for_a_ci(store):
+    assert model_api.extract_ci_name("What is the status of INC9999?", store, {"last_ci": "WEB-PROD-01"}) == "WEB-PROD-01"
+
+
+@pytest.mark.parametrize("query", [
+    "Can you give a follow-up on the health?",
+    "Give me a real-time health status",
+    "What is the up-to-date status",
+    "show me the end-to-end dependencies"
+])
+def test_hyphenated_words_are_not_taken_for_a_ci(store, query):
+    context = {"last_ci": "WEB-PROD-01"}
+    assert model_api.extract_ci_name(query, store, context) == "WEB-PROD-01"
+    model_api.process_query(query, context, store, summarise=False)
+    assert context["last_ci"] == "WEB-PROD-01"
+
+
+def test_unknown_name_after_of_is_reported(store):
+    assert model_api.extract_ci_name("Check health of ServerX", store, {"last_ci": "WEB-PROD-01"}) == "ServerX"
+    assert model_api.extract_ci_name("Check health of db_main", store, {"last_ci": "WEB-PROD-01"}) == "db_main"
+    assert model_api.extract_ci_name("Check health of the server", store, {"last_ci": "WEB-PROD-01"}) == "WEB-PROD-01"
@@ -0,0 +1,13 @@
+import pytest
+
+from intent_classifier import classify_intent
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("run a health check on web-prod-01", "CI Health Check"),
+    ("restart web-prod-01", "Automation Execution"),
+    ("execute the cleanup automation on db-prod-03", "Automation Execution"),
+    ("Check health of web-prod-01", "CI Health Check")
+])
+def test_rules(query, intent):
+    assert classify_intent(query) == (intent, "None")
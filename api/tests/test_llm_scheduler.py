@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from llm_scheduler import LLMScheduler, LLMStalled, LLMUnavailable
+
+
+def test_coalesced_caller_outlives_the_first_timeout():
+    release = threading.Event()
+    calls = []
+
+    def call(prompt):
+        calls.append(prompt)
+        release.wait(5)
+        return {"message": {"content": "ok"}}
+
+    scheduler = LLMScheduler(call, "model", max_concurrency=1)
+    impatient = scheduler.submit("prompt", "health", timeout=0.05)
+    patient = scheduler.submit("prompt", "health", timeout=5)
+    assert patient is impatient
+
+    with pytest.raises(LLMUnavailable):
+        scheduler.wait(impatient, timeout=0.05)
+    # The patient caller still holds the flight, so an identical prompt joins it
+    assert scheduler.submit("prompt", "health", timeout=5) is patient
+
+    release.set()
+    assert scheduler.wait(patient, timeout=5)["message"]["content"] == "ok"
+    assert calls == ["prompt"]
+    assert scheduler.breaker.failures == 0
+
+
+def test_stream_yields_chunks_from_a_worker_slot():
+    scheduler = LLMScheduler(None, "model", stream_call=lambda prompt: iter(["a", "b"]))
+    assert list(scheduler.stream("prompt", "health_stream")) == ["a", "b"]
+    assert scheduler.breaker.failures == 0
+
+
+def test_stalled_stream_is_abandoned_and_trips_the_breaker():
+    release = threading.Event()
+
+    def stream_call(prompt):
+        yield "first"
+        release.wait(5)
+        yield "late"
+
+    scheduler = LLMScheduler(None, "model", timeout=5, stream_call=stream_call, idle_timeout=0.1)
+    chunks = []
+    with pytest.raises(LLMStalled):
+        for chunk in scheduler.stream("prompt", "health_stream"):
+            chunks.append(chunk)
+    release.set()
+    assert chunks == ["first"]
+    assert scheduler.breaker.failures == 1
@@ -0,0 +1,332 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+METRICS = ("cpu_usage", "memory_usage", "disk_usage")
+HEALTH_STATES = ("Healthy", "Warning", "Critical")
+NO_DATA = -1
+
+# Percent (warning, critical) applied to each metric's rolling p95
+DEFAULT_THRESHOLDS = {"cpu_usage": (75.0, 90.0), "memory_usage": (80.0, 90.0), "disk_usage": (80.0, 90.0)}
+
+# Observability statuses as a HEALTH_STATES index; labels not listed count as Healthy
+REPORTED_STATES = {
+    "healthy": 0, "ok": 0, "up": 0,
+    "warning": 1, "degraded": 1, "minor": 1,
+    "critical": 2, "major": 2, "down": 2, "outage": 2, "unavailable": 2, "unhealthy": 2
+}
+
+# (ci, metric, value, timestamp in epoch seconds)
+Sample = Tuple[str, str, float, float]
+
+
+def parse_percent(value) -> Optional[float]:
+    """92, 92.0 and "92%" -> 92.0; anything else -> None."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except ValueError:
+        return None
+
+
+def parse_timestamp(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def valid_sample(sample: Sample) -> bool:
+    ci, metric, value, timestamp = sample
+    return bool(ci) and metric in METRICS and value is not None and timestamp is not None
+
+
+def reported_state(status: Optional[str]) -> int:
+    return REPORTED_STATES.get(str(status or "").strip().lower(), 0)
+
+
+def snapshot_samples(entries: Iterable, now: Optional[float] = None) -> List[Sample]:
+    """One sample per metric from observability_data.json style snapshots."""
+    samples = []
+    for entry in entries:
+        timestamp = parse_timestamp(entry.get("last_updated")) or now or time.time()
+        for metric in METRICS:
+            value = parse_percent(entry.get(metric))
+            if value is not None:
+                samples.append((entry["ci"], metric, value, timestamp))
+    return samples
+
+
+class HealthEvaluation:
+    """Rolling-window statistics and health of every CI from one vectorised pass.
+
+    Each statistic is an array of shape (CIs, metrics); ``state`` holds the
+    per-metric HEALTH_STATES index (NO_DATA for an empty window),
+    ``metric_status`` the worst metric per CI and ``status`` the CI's health,
+    which ``with_reported`` raises to the status its monitoring reports.
+    """
+
+    def __init__(self, names: List[str], rows: Dict[str, int], stats: Dict[str, np.ndarray],
+                 state: np.ndarray, trend: np.ndarray):
+        self.names = names
+        self.rows = rows
+        self.stats = stats
+        self.state = state
+        self.trend = trend
+        self.metric_status = state.max(axis=1) if len(names) else np.empty(0, np.int8)
+        self.status = self.metric_status
+
+    def with_reported(self, reported: Callable[[str], Optional[str]]) -> "HealthEvaluation":
+        """A copy whose CI status is the worse of the metrics and ``reported(ci)``."""
+        combined = HealthEvaluation(self.names, self.rows, self.stats, self.state, self.trend)
+        states = np.array([reported_state(reported(name)) for name in self.names], np.int8)
+        combined.status = np.where(self.metric_status == NO_DATA, NO_DATA, np.maximum(self.metric_status, states))
+        return combined
+
+    def for_ci(self, ci: str) -> Optional[Dict]:
+        row = self.rows.get(ci.lower())
+        if row is None or self.status[row] == NO_DATA:
+            return None
+        metrics = {}
+        for column, metric in enumerate(METRICS):
+            if self.state[row, column] == NO_DATA:
+                continue
+            metrics[metric] = {
+                name: round(float(values[row, column]), 2) for name, values in self.stats.items()
+            }
+            metrics[metric]["state"] = HEALTH_STATES[self.state[row, column]]
+            metrics[metric]["trend"] = ("falling", "steady", "rising")[self.trend[row, column] + 1]
+        return {
+            "ci": self.names[row],
+            "status": HEALTH_STATES[self.status[row]],
+            "metric_status": HEALTH_STATES[self.metric_status[row]],
+            "metrics": metrics
+        }
+
+    def counts(self) -> Dict[str, int]:
+        evaluated = self.status[self.status != NO_DATA]
+        return {state: int((evaluated == index).sum()) for index, state in enumerate(HEALTH_STATES)}
+
+    def cis_with_status(self, status: str) -> List[str]:
+        index = HEALTH_STATES.index(status)
+        return [self.names[row] for row in np.flatnonzero(self.status == index)]
+
+
+class MetricStore:
+    """Per-CI, per-metric ring buffers of (timestamp, value) samples.
+
+    Values and times live in two (CIs, metrics, capacity) arrays, so the
+    rolling window of every series is evaluated with whole-array NumPy
+    operations rather than a Python loop per CI. Each series' window ends at
+    its own newest sample. ``evaluate`` is memoised until new samples arrive,
+    and then reused for up to ``min_interval`` seconds.
+    """
+
+    def __init__(self, capacity: int = 120, window: float = 3600.0,
+                 thresholds: Optional[Dict[str, Sequence[float]]] = None,
+                 trend_threshold: float = 5.0, trend_horizon: float = 1.0, min_interval: float = 1.0,
+                 initial_cis: int = 256):
+        self.capacity = capacity
+        self.window = window
+        limits = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.warning = np.array([limits[metric][0] for metric in METRICS], np.float32)
+        self.critical = np.array([limits[metric][1] for metric in METRICS], np.float32)
+        # Percentage points per hour before a series counts as rising or falling
+        self.trend_threshold = trend_threshold
+        # Hours ahead a rising series is projected when checking for a critical crossing
+        self.trend_horizon = trend_horizon
+        # Under a steady stream of samples, re-evaluate at most this often (seconds)
+        self.min_interval = min_interval
+        self.names: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.values = np.full((initial_cis, len(METRICS), capacity), np.nan, np.float32)
+        self.times = np.zeros((initial_cis, len(METRICS), capacity), np.float64)
+        self.heads = np.zeros((initial_cis, len(METRICS)), np.int64)
+        self.samples = 0
+        self.version = 0
+        self._evaluation: Optional[Tuple[int, float, HealthEvaluation]] = None
+        self._lock = threading.Lock()
+        self._evaluating = threading.Lock()
+
+    def _row(self, ci: str) -> int:
+        key = ci.lower()
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = len(self.names)
+            self.names.append(ci)
+            if row == len(self.values):
+                grow = len(self.values)
+                self.values = np.concatenate([self.values, np.full_like(self.values[:grow], np.nan)])
+                self.times = np.concatenate([self.times, np.zeros_like(self.times[:grow])])
+                self.heads = np.concatenate([self.heads, np.zeros_like(self.heads[:grow])])
+        return row
+
+    def add(self, samples: Iterable[Sample]) -> Tuple[int, int]:
+        """Append samples; returns (accepted, rejected). Unknown metrics are rejected."""
+        columns = {metric: column for column, metric in enumerate(METRICS)}
+        rows, cols, values, stamps = [], [], [], []
+        rejected = 0
+        with self._lock:
+            for sample in samples:
+                if not valid_sample(sample):
+                    rejected += 1
+                    continue
+                ci, metric, value, timestamp = sample
+                rows.append(self._row(ci))
+                cols.append(columns[metric])
+                values.append(value)
+                stamps.append(timestamp)
+            if rows:
+                self._write(np.array(rows), np.array(cols), np.array(values, np.float32), np.array(stamps))
+                self.samples += len(rows)
+                self.version += 1
+        return len(rows), rejected
+
+    def _write(self, rows: np.ndarray, cols: np.ndarray, values: np.ndarray, stamps: np.ndarray) -> None:
+        # Samples for the same series take consecutive slots in arrival order
+        series = rows * len(METRICS) + cols
+        order = np.argsort(series, kind="stable")
+        series = series[order]
+        first = np.r_[True, series[1:] != series[:-1]]
+        positions = np.arange(len(series))
+        ordinal = positions - np.maximum.accumulate(np.where(first, positions, 0))
+        rows, cols = rows[order], cols[order]
+        slots = (self.heads[rows, cols] + ordinal) % self.capacity
+        self.values[rows, cols, slots] = values[order]
+        self.times[rows, cols, slots] = stamps[order]
+        np.add.at(self.heads, (rows, cols), 1)
+
+    def evaluate(self) -> HealthEvaluation:
+        # One evaluation at a time; ingestion only waits for the copy
+        with self._evaluating:
+            with self._lock:
+                now = time.monotonic()
+                if self._evaluation is not None:
+                    version, evaluated_at, evaluation = self._evaluation
+                    if version == self.version or now - evaluated_at < self.min_interval:
+                        return evaluation
+                count = len(self.names)
+                version = self.version
+                values, times = self.values[:count].copy(), self.times[:count].copy()
+                names, rows = list(self.names), dict(self.rows)
+            evaluation = self._evaluate(values, times, names, rows)
+            self._evaluation = (version, now, evaluation)
+            return evaluation
+
+    def _evaluate(self, values: np.ndarray, times: np.ndarray, names: List[str],
+                  rows: Dict[str, int]) -> HealthEvaluation:
+        filled = ~np.isnan(values)
+        stamped = np.where(filled, times, -np.inf)
+        newest_slot = stamped.argmax(axis=2)[..., None]
+        newest = np.take_along_axis(stamped, newest_slot, axis=2)
+        in_window = filled & (times >= newest - self.window)
+        samples = in_window.sum(axis=2)
+        empty = samples == 0
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            latest = np.take_along_axis(values, newest_slot, axis=2)[..., 0]
+            low = np.where(in_window, values, np.inf)
+            high = np.where(in_window, values, -np.inf)
+            minimum = np.where(empty, np.nan, low.min(axis=2))
+            maximum = np.where(empty, np.nan, high.max(axis=2))
+            average = np.where(in_window, values, 0).sum(axis=2, dtype=np.float64) / samples
+
+            # Out-of-window slots are -inf and sort first, so the nearest-rank p95 of
+            # n samples sits at capacity - n + ceil(0.95 n) - 1. Windows mostly share
+            # a length, so a partition per distinct length replaces a full sort.
+            p95 = np.full(samples.shape, np.nan, np.float32)
+            kth = self.capacity - samples + np.ceil(0.95 * samples).astype(np.int64) - 1
+            for k in np.unique(kth[~empty]):
+                selected = (kth == k) & ~empty
+                p95[selected] = np.partition(high[selected], k, axis=-1)[:, k]
+
+            # Least-squares slope in percentage points per hour
+            hours = np.where(in_window, (times - newest) / 3600.0, 0.0).astype(np.float32)
+            mean_hours = hours.sum(axis=2) / samples
+            centred = np.where(in_window, hours - mean_hours[..., None], 0.0)
+            deviation = np.where(in_window, values - average[..., None].astype(np.float32), 0.0)
+            variance = (centred * centred).sum(axis=2)
+            slope = np.where(variance > 0, (centred * deviation).sum(axis=2) / variance, 0.0)
+
+            state = (p95 >= self.warning).astype(np.int8) + (p95 >= self.critical).astype(np.int8)
+            # A series rising fast enough to turn critical within the horizon is at least a warning
+            projected = latest + slope * self.trend_horizon
+            state = np.where((slope > self.trend_threshold) & (projected >= self.critical), np.maximum(state, 1), state)
+        state = np.where(empty, NO_DATA, state).astype(np.int8)
+        trend = np.where(slope > self.trend_threshold, 1, np.where(slope < -self.trend_threshold, -1, 0)).astype(np.int8)
+        stats = {"latest": latest, "min": minimum, "max": maximum, "avg": average, "p95": p95, "slope_per_hour": slope}
+        return HealthEvaluation(names, rows, stats, state, trend)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"cis": len(self.names), "samples": self.samples, "version": self.version}
+
+
+class SampleLog:
+    """Append-only SQLite log of posted samples shared by worker processes.
+
+    Every process appends what it receives and ``sync`` copies the rows it
+    has not seen yet into its own MetricStore, so each worker evaluates the
+    same samples. Rows older than ``retention`` seconds are pruned; a worker
+    started later replays whatever is left.
+    """
+
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, path: str, retention: float = 3600.0):
+        self.path = path
+        self.retention = retention
+        self.position = 0
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._last_prune = 0.0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS samples ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, ci TEXT, metric TEXT, value REAL, timestamp REAL, added_at REAL)"
+            )
+        self._prune(time.time())
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def append(self, samples: List[Sample]) -> None:
+        now = time.time()
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT INTO samples (ci, metric, value, timestamp, added_at) VALUES (?, ?, ?, ?, ?)",
+                [(ci, metric, value, timestamp, now) for ci, metric, value, timestamp in samples]
+            )
+        if now - self._last_prune > self.PRUNE_INTERVAL:
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        self._last_prune = now
+        with self._connection() as connection:
+            connection.execute("DELETE FROM samples WHERE added_at < ?", (now - self.retention,))
+
+    def sync(self, store: MetricStore) -> int:
+        """Add the rows appended since the last sync to ``store``; returns how many."""
+        with self._sync_lock:
+            rows = self._connection().execute(
+                "SELECT id, ci, metric, value, timestamp FROM samples WHERE id > ? ORDER BY id", (self.position,)
+            ).fetchall()
+            if rows:
+                store.add(row[1:] for row in rows)
+                self.position = rows[-1][0]
+            return len(rows)
@@ -1,6 +1,8 @@
 import json
 import ollama
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, Tuple, Optional, List
 
 CONFIG = {
@@ -8,7 +10,9 @@ CONFIG = {
     "dashboards_file": "dashboard_mapping.json",
     "observability_file": "observability_data.json",
     "cmdb_file": "cmdb_data.json",
-    "llm_model": "mistral"
+    "llm_model": "mistral",
+    "health_concurrency": 8,
+    "health_timeout": 30
 }
 
 def load_json(file_path: str) -> Dict:
@@ -49,6 +53,39 @@ def get_ci_health_status(ci: str, observability_data: list) -> Dict[str, str]:
             return {"status": entry["status"], "message": message}
     return {"status": "Unknown", "message": "No observability data available"}
 
+def get_raw_health_status(ci: str, observability_data: list) -> Dict[str, str]:
+    for entry in observability_data:
+        if entry["ci"].lower() == ci.lower():
+            return {"status": entry["status"], "message": "No additional health details available."}
+    return {"status": "Unknown", "message": "No observability data available"}
+
+def get_ci_health_statuses(cis: List[str], observability_data: list) -> Dict[str, Dict[str, str]]:
+    unique_cis = list({ci.lower(): ci for ci in cis}.values())
+    results: Dict[str, Dict[str, str]] = {}
+    started: Dict[str, float] = {}
+
+    def summarise(ci: str) -> Dict[str, str]:
+        started[ci] = time.monotonic()
+        return get_ci_health_status(ci, observability_data)
+
+    executor = ThreadPoolExecutor(max_workers=CONFIG["health_concurrency"])
+    pending = {executor.submit(summarise, ci): ci for ci in unique_cis}
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future).lower()] = future.result()
+            now = time.monotonic()
+            for future, ci in list(pending.items()):
+                if ci in started and now - started[ci] > CONFIG["health_timeout"]:
+                    print(f"Timed out generating health summary for {ci}")
+                    future.cancel()
+                    del pending[future]
+                    results[ci.lower()] = get_raw_health_status(ci, observability_data)
+    finally:
+        executor.shutdown(wait=False)
+    return results
+
 def get_observability_updates(ci: str, observability_data: list) -> str:
     for entry in observability_data:
         if entry["ci"].lower() == ci.lower():
@@ -116,15 +153,28 @@ def get_ci_dependencies(ci_name: str, cmdb_data: list) -> Dict[str, List[Dict]]:
             }
     return {"upstream": [], "downstream": []}
 
-def list_open_incidents_with_ci_health(servicenow_data: list, observability_data: list) -> None:
+def priority_rank(priority: Optional[str]) -> int:
+    match = re.match(r"\s*(\d+)", priority or "")
+    return int(match.group(1)) if match else 99
+
+def get_open_incidents(servicenow_data: list) -> List[Dict]:
+    # Highest priority first, most recently updated first within a priority
     open_incidents = [i for i in servicenow_data if i["status"].lower() not in ["resolved", "closed"]]
+    open_incidents.sort(key=lambda i: i.get("updated_at") or "", reverse=True)
+    open_incidents.sort(key=lambda i: priority_rank(i.get("priority")))
+    return open_incidents
+
+def list_open_incidents_with_ci_health(open_incidents: List[Dict], observability_data: list) -> None:
     if not open_incidents:
         print("No open incidents found.")
         return
     print(f"Found {len(open_incidents)} open incidents with CI health statuses:")
+    health_statuses = get_ci_health_statuses(
+        [incident.get("affected_ci", "Unknown CI") for incident in open_incidents], observability_data
+    )
     for incident in open_incidents:
         ci_name = incident.get("affected_ci", "Unknown CI")
-        health_status = get_ci_health_status(ci_name, observability_data)
+        health_status = health_statuses[ci_name.lower()]
         print(f"- Incident {incident['id']} (CI: {ci_name})")
         print(f"  - Status: {incident['status']}")
         print(f"  - CI Health: {health_status['status']}")
@@ -156,6 +206,9 @@ def main():
         print("Critical data files are missing or invalid. Exiting.")
         return
 
+    # The data is not reloaded while the CLI runs, so the open list is built once
+    open_incidents = get_open_incidents(servicenow_data)
+
     context = {"last_incident_id": None, "last_ci": None}
     print("OpsBuddy is ready! Type 'exit' to quit.")
     while True:
@@ -199,7 +252,6 @@ def main():
                 else:
                     print(f"Incident {incident_id} not found.")
             else:
-                open_incidents = [i for i in servicenow_data if i["status"].lower() not in ["resolved", "closed"]]
                 if open_incidents:
                     print(f"Found {len(open_incidents)} open incidents:")
                     for i in open_incidents:
@@ -225,7 +277,7 @@ def main():
                 print("Please specify a CI or provide an incident ID.")
 
         elif intent == "List Open Incidents with CI Health":
-            list_open_incidents_with_ci_health(servicenow_data, observability_data)
+            list_open_incidents_with_ci_health(open_incidents, observability_data)
 
         elif intent == "Dependency Impact Analysis":
             ci_name = ci_name or context.get("last_ci")
@@ -2,14 +2,21 @@
 // API service for communicating with the backend
 import { toast } from 'sonner';
 
-interface QueryResponse {
+export interface QueryResponse {
   intent: string;
   sub_intent: string;
+  intent_source?: 'rules' | 'cache' | 'llm';
+  session_id?: string;
   response: any;
 }
 
 const API_BASE_URL = 'http://localhost:5000'; // Update this to your actual backend URL in production
 
+// Identifies this browser tab's conversation so the backend keeps its context separate
+const SESSION_ID = typeof crypto !== 'undefined' && 'randomUUID' in crypto
+  ? crypto.randomUUID()
+  : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 export const sendQuery = async (query: string): Promise<QueryResponse> => {
   try {
     const response = await fetch(`${API_BASE_URL}/query`, {
@@ -17,7 +24,7 @@ export const sendQuery = async (query: string): Promise<QueryResponse> => {
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ query }),
+      body: JSON.stringify({ query, session_id: SESSION_ID }),
     });
 
     if (!response.ok) {
@@ -41,6 +48,83 @@ export const sendQuery = async (query: string): Promise<QueryResponse> => {
   }
 };
 
+export interface StreamHandlers {
+  onResult?: (result: QueryResponse) => void;
+  onToken?: (content: string) => void;
+  onDetails?: (ci: string, details: string) => void;
+  onHealth?: (ci: string, ciHealth: string, details: string) => void;
+  onDone?: () => void;
+}
+
+// Consume the server-sent events emitted by /query/stream
+export const streamQuery = async (query: string, handlers: StreamHandlers): Promise<void> => {
+  const response = await fetch(`${API_BASE_URL}/query/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+    },
+    body: JSON.stringify({ query, session_id: SESSION_ID }),
+  });
+
+  if (!response.ok || !response.body) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.error || 'Failed to get a response from the backend');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const dispatch = (rawEvent: string) => {
+    let event = 'message';
+    let data = '';
+    rawEvent.split('\n').forEach((line) => {
+      if (line.startsWith('event:')) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith('data:')) {
+        data += line.slice(5).trim();
+      }
+    });
+    const payload = data ? JSON.parse(data) : {};
+
+    switch (event) {
+      case 'result':
+        handlers.onResult?.(payload);
+        break;
+      case 'token':
+        handlers.onToken?.(payload.content);
+        break;
+      case 'details':
+        handlers.onDetails?.(payload.ci, payload.details);
+        break;
+      case 'health':
+        handlers.onHealth?.(payload.ci, payload.ci_health, payload.details);
+        break;
+      case 'done':
+        handlers.onDone?.();
+        break;
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      dispatch(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+
+  if (buffer.trim()) {
+    dispatch(buffer);
+  }
+};
+
 // Helper function to format the response for display
 export const formatApiResponse = (apiResponse: QueryResponse): { content: string; severity: 'info' | 'warning' | 'critical' | 'resolved' } => {
   const { intent, response } = apiResponse;
@@ -167,6 +251,40 @@ export const formatApiResponse = (apiResponse: QueryResponse): { content: string
         content += `- Downstream: None\n`;
       }
     }
+
+    if (response.impact) {
+      content += `\nTransitive impact (up to ${response.impact.max_depth} hops):\n`;
+      ['upstream', 'downstream'].forEach((direction) => {
+        const reached = response.impact[direction];
+        if (!reached) return;
+        content += `- ${direction === 'upstream' ? 'Upstream' : 'Downstream'}: ${reached.length ? '' : 'None'}\n`;
+        reached.forEach((dep: any) => {
+          content += `  - ${dep.ci} (${dep.depth} hop${dep.depth === 1 ? '' : 's'}: ${dep.path.join(' -> ')})\n`;
+        });
+      });
+      if (response.impact.shared_root_causes && response.impact.shared_root_causes.length > 0) {
+        content += `- Open incidents sharing a root cause:\n`;
+        response.impact.shared_root_causes.forEach((group: any) => {
+          content += `  - ${group.root_ci}: ${group.incidents.join(', ')}\n`;
+        });
+      }
+    }
+  }
+
+  // Recommendations Search
+  if (intent === 'Recommendations Search' && response.recommendations) {
+    content = response.incident_id
+      ? `Resolved incidents similar to ${response.incident_id}:\n`
+      : `${response.message}\n`;
+    response.recommendations.forEach((rec: any) => {
+      content += `- ${rec.id}: ${rec.short_description} (${rec.affected_ci || 'unknown CI'}, similarity ${rec.similarity})\n`;
+      if (rec.resolution_notes) {
+        content += `  Resolution: ${rec.resolution_notes}\n`;
+      }
+    });
+    if (response.recommendations.length === 0) {
+      content += `${response.message}\n`;
+    }
   }
 
   // If we couldn't format the response, just convert it to a string